@@ -0,0 +1,90 @@
+"""
+Stateless JWT authentication for the role permissions. Access tokens carry
+user_type and profile_id claims (see TokenSerializers), so a request is
+authorized from the token alone: request.user is a ClaimsUser that reads
+the profile or the User row only when code asks for something the claims
+do not hold. Tokens issued before the claims existed fall back to the usual
+database lookup.
+"""
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from api.models.auth import ApplicantProfile
+from api.utils.token_revocation import is_revoked
+
+# what User.profile raises, an AttributeError too so hasattr() keeps working
+NoProfile = User.profile.RelatedObjectDoesNotExist
+
+
+class ClaimsUser:
+    """
+    Lazy stand-in for the User of a request. id, user_type and profile_id
+    come from the token; profile loads only the ApplicantProfile row and any
+    other attribute loads the User (once).
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.token = token
+        self.id = self.pk = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+        self.user_type = token.get('user_type')
+        self.profile_id = token.get('profile_id')
+
+    @cached_property
+    def profile(self):
+        profile = None
+        if self.profile_id is not None:
+            profile = ApplicantProfile.objects.filter(pk=self.profile_id).first()
+        if profile is None:
+            raise NoProfile("User has no profile.")
+        return profile
+
+    @cached_property
+    def user(self):
+        return User.objects.get(pk=self.id)
+
+    def __getattr__(self, name):
+        # only reached for attributes the claims do not answer
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        return isinstance(other, (ClaimsUser, User)) and self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return f"user {self.pk}"
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if 'user_type' not in validated_token:
+            return super().get_user(validated_token)
+        if is_revoked(validated_token):
+            raise AuthenticationFailed("Token has been revoked.", code='token_revoked')
+        return ClaimsUser(validated_token)
+
+
+def user_type(user):
+    """Role of the request user, from the token claims when it has them"""
+    if not user.is_authenticated:
+        return None
+    if isinstance(user, ClaimsUser):
+        return user.user_type
+    profile = getattr(user, 'profile', None)
+    return profile.user_type if profile else None
+
+
+def profile_id(user):
+    """Profile pk of the request user without loading the profile when the token has it"""
+    if isinstance(user, ClaimsUser):
+        if user.profile_id is None:
+            raise NoProfile("User has no profile.")
+        return user.profile_id
+    return user.profile.pk
@@ -0,0 +1,56 @@
+"""
+Sparse fieldsets for the admin viewsets.
+
+    ?fields=uuid,title     only these fields are serialized
+    ?expand=questions      include an expandable (nested) field
+
+A view lists its nested fields in expandable_fields, mapped to the lookups
+to prefetch for them. List actions leave them out unless they are asked for
+(in ?expand= or ?fields=); other actions keep them unless ?fields= leaves
+them out. The lookups are prefetched when list or retrieve serializes the field.
+"""
+
+
+def _names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    expandable_fields = {}
+
+    def requested_fields(self):
+        return _names(self.request.query_params.get('fields')) if self.request else set()
+
+    def expansions(self):
+        """Expandable fields that are serialized for this request"""
+        if self.request is None:
+            return set(self.expandable_fields)
+        requested = _names(self.request.query_params.get('expand')) | self.requested_fields()
+        if self.action != 'list' and not self.request.query_params.get('fields'):
+            requested |= set(self.expandable_fields)
+        return requested & set(self.expandable_fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # other actions only look the object up
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        lookups = [lookup for name in self.expansions() for lookup in self.expandable_fields[name]]
+        return queryset.prefetch_related(*lookups) if lookups else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        # writes answer with the full representation
+        if self.request is None or self.request.method != 'GET':
+            return serializer
+        fields = getattr(serializer, 'child', serializer).fields
+        requested = self.requested_fields()
+        expansions = self.expansions()
+        for name in list(fields):
+            if name in self.expandable_fields:
+                keep = name in expansions
+            else:
+                keep = not requested or name in requested
+            if not keep:
+                fields.pop(name)
+        return serializer
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models.exam import Exam
+from api.utils.item_analysis import analyze_exam, analyze_all
+
+
+class Command(BaseCommand):
+    help = "Recomputes the item analysis (difficulty, discrimination, choice rates) of exam questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_uuid', nargs='?', help="Only this exam's questions")
+
+    def handle(self, *args, **options):
+        if options['exam_uuid']:
+            try:
+                exam = Exam.objects.get(uuid=options['exam_uuid'])
+            except (Exam.DoesNotExist, ValueError):
+                raise CommandError(f"Exam {options['exam_uuid']} does not exist")
+            total = len(analyze_exam(exam))
+        else:
+            total = analyze_all()
+        self.stdout.write(self.style.SUCCESS(f"Analysed {total} question(s)"))
@@ -0,0 +1,36 @@
+import os
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from api.utils.login_pool import make_pool, verify
+
+
+class Command(BaseCommand):
+    help = "Measures password verifications (logins) per second for several process pool sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default=None, help="Comma separated pool sizes, default 1,2,4,... up to the CPU count")
+        parser.add_argument('--logins', type=int, default=200)
+
+    def handle(self, *args, **options):
+        cpus = os.cpu_count() or 1
+        if options['workers']:
+            sizes = [int(size) for size in options['workers'].split(',')]
+        else:
+            sizes = sorted({min(2 ** power, cpus) for power in range(cpus.bit_length() + 1)})
+        encoded = make_password('benchmark-password')
+
+        started = time.perf_counter()
+        for _ in range(min(options['logins'], 20)):
+            verify('benchmark-password', encoded)
+        inline = min(options['logins'], 20) / (time.perf_counter() - started)
+        self.stdout.write(f"inline: {inline:.1f} logins/s")
+
+        for size in sizes:
+            with make_pool(size) as pool:
+                # start every process before timing
+                list(pool.map(verify, ['warm-up'] * size, [encoded] * size))
+                started = time.perf_counter()
+                list(pool.map(verify, ['benchmark-password'] * options['logins'], [encoded] * options['logins']))
+                elapsed = time.perf_counter() - started
+            self.stdout.write(f"{size} worker(s): {options['logins'] / elapsed:.1f} logins/s")
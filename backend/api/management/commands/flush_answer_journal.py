@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.utils import answer_journal
+
+
+class Command(BaseCommand):
+    help = "Drains the write-behind answer journal into ApplicantAnswer"
+
+    def handle(self, *args, **options):
+        drained = answer_journal.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {drained} journaled answer(s)"))
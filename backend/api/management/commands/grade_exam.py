@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models.exam import Exam
+from api.utils.grading import grade_exam
+
+
+class Command(BaseCommand):
+    help = "Completes and grades every in-progress attempt of an exam in one pass"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_uuid')
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(uuid=options['exam_uuid'])
+        except (Exam.DoesNotExist, ValueError):
+            raise CommandError(f"Exam {options['exam_uuid']} does not exist")
+
+        graded = grade_exam(exam)
+        self.stdout.write(self.style.SUCCESS(f"Graded {graded} attempt(s) of {exam.title}"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.utils import applicant_import
+
+
+class Command(BaseCommand):
+    help = "Creates applicant accounts in bulk from a CSV or JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="A .csv (header line first) or .json file")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the rows")
+        parser.add_argument('--chunk-size', type=int, default=applicant_import.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        file_type = 'json' if options['path'].lower().endswith('.json') else 'csv'
+        try:
+            with open(options['path'], 'rb') as upload:
+                rows = applicant_import.read_rows(upload.read(), file_type)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+
+        report = applicant_import.import_applicants(
+            rows, options['dry_run'], options['chunk_size'], in_pool=True
+        )
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        verb = "Would import" if report['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['imported']} of {report['total']} applicant(s), {len(report['errors'])} rejected"
+        ))
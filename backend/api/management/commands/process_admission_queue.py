@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models.exam import Exam
+from api.utils.admission import exams_to_process, process_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Admits pending exam applications and promotes waitlisted ones into free seats "
+        "(e.g. tickets left behind by a stopped worker)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_uuid', nargs='?', help="Only this exam's queue")
+
+    def handle(self, *args, **options):
+        if options['exam_uuid']:
+            try:
+                exam_ids = [Exam.objects.get(uuid=options['exam_uuid']).pk]
+            except (Exam.DoesNotExist, ValueError):
+                raise CommandError(f"Exam {options['exam_uuid']} does not exist")
+        else:
+            exam_ids = exams_to_process()
+
+        total = sum(process_queue(exam_id) for exam_id in list(exam_ids))
+        self.stdout.write(self.style.SUCCESS(f"Settled {total} admission ticket(s)"))
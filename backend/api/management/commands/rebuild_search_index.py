@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.utils.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the applicant search index (e.g. after bulk updates that bypassed signals)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} profile(s)"))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.utils.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized per-exam and per-course result statistics"
+
+    def handle(self, *args, **options):
+        rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS("Result statistics rebuilt"))
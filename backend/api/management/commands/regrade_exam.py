@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models.exam import Exam
+from api.utils.grading import regrade_exam
+
+
+class Command(BaseCommand):
+    help = "Recomputes answer correctness, counters and scores of an exam after its answer key changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_uuid')
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(uuid=options['exam_uuid'])
+        except (Exam.DoesNotExist, ValueError):
+            raise CommandError(f"Exam {options['exam_uuid']} does not exist")
+
+        report = regrade_exam(exam)
+        self.stdout.write(self.style.SUCCESS(
+            f"Regraded {exam.title}: {report['answers_changed']} answer(s) and "
+            f"{report['attempts_changed']} of {report['attempts_checked']} attempt(s) changed"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from api.utils.recommendations import rerecommend_courses
+
+
+class Command(BaseCommand):
+    help = "Recomputes recommended courses of completed attempts against the current course thresholds"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        report = rerecommend_courses(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {report['attempts_updated']} attempt(s) and {report['profiles_updated']} profile(s)"
+        ))
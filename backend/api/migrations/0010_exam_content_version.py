@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_alter_applicantexam_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever a question or choice of this exam changes'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:46
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_seats(apps, schema_editor):
+    Exam = apps.get_model('api', 'Exam')
+    ApplicantExam = apps.get_model('api', 'ApplicantExam')
+    counts = ApplicantExam.objects.values('exam_id').annotate(n=Count('id')).order_by()
+    for row in counts:
+        Exam.objects.filter(pk=row['exam_id']).update(seats_taken=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_exam_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of ApplicantExam rows holding a seat, kept by reserve_seat/release_seat'),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
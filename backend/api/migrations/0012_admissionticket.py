@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:48
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_exam_seats_taken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('admitted', 'Admitted'), ('rejected', 'Rejected')], default='pending', max_length=10)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='admission_tickets', to='api.applicantprofile')),
+                ('applicant_exam', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.applicantexam')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='admission_tickets', to='api.exam')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['exam', 'status', 'id'], name='api_admissi_exam_id_5c9b67_idx')],
+            },
+        ),
+    ]
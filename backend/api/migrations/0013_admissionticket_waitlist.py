@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_admissionticket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admissionticket',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('waitlisted', 'Waitlisted'), ('admitted', 'Admitted'), ('rejected', 'Rejected')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_admissionticket_waitlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='applicantexam',
+            index=models.Index(fields=['status', '-completed_at', '-id'], name='attempt_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='applicantexam',
+            index=models.Index(fields=['status', '-recommendation_score', '-completed_at', '-id'], name='attempt_ranked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='applicantprofile',
+            index=models.Index(fields=['user_type', 'created_at', 'id'], name='profile_created_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_existing_profiles(apps, schema_editor):
+    from api.utils.search import tokenize
+
+    ApplicantProfile = apps.get_model('api', 'ApplicantProfile')
+    ApplicantSearchToken = apps.get_model('api', 'ApplicantSearchToken')
+    ApplicantSearchToken.objects.bulk_create([
+        ApplicantSearchToken(profile_id=profile.pk, token=token)
+        for profile in ApplicantProfile.objects.select_related('user').iterator()
+        for token in tokenize(
+            profile.user.first_name, profile.user.last_name, profile.user.email,
+            profile.contact_number, profile.high_school
+        )
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='api.applicantprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'profile'], name='search_token_idx')],
+                'unique_together': {('profile', 'token')},
+            },
+        ),
+        migrations.RunPython(index_existing_profiles, migrations.RunPython.noop),
+    ]
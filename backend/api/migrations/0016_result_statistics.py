@@ -0,0 +1,75 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_statistics(apps, schema_editor):
+    from collections import Counter
+    from django.db.models import Count, Max, Min, Sum
+
+    ApplicantExam = apps.get_model('api', 'ApplicantExam')
+    ApplicantProfile = apps.get_model('api', 'ApplicantProfile')
+    Course = apps.get_model('api', 'Course')
+    ResultStatistic = apps.get_model('api', 'ResultStatistic')
+    CourseStatistic = apps.get_model('api', 'CourseStatistic')
+
+    recommended = Counter()
+    cells = []
+    for cell in ApplicantExam.objects.filter(
+        status='completed', recommendation_score__isnull=False
+    ).values('exam_id', 'recommended_course_id').annotate(
+        attempts=Count('id'),
+        score_sum=Sum('recommendation_score'),
+        min_score=Min('recommendation_score'),
+        max_score=Max('recommendation_score'),
+    ).order_by():
+        recommended[cell['recommended_course_id']] += cell['attempts']
+        cells.append(ResultStatistic(
+            exam_id=cell['exam_id'], course_id=cell['recommended_course_id'], attempts=cell['attempts'],
+            score_sum=cell['score_sum'], min_score=cell['min_score'], max_score=cell['max_score'],
+        ))
+    ResultStatistic.objects.bulk_create(cells, batch_size=1000)
+
+    applicants = dict(ApplicantProfile.objects.filter(
+        user_type='applicant', course_applied__isnull=False
+    ).values('course_applied_id').annotate(n=Count('id')).order_by().values_list('course_applied_id', 'n'))
+    CourseStatistic.objects.bulk_create([
+        CourseStatistic(course_id=pk, applicants=applicants.get(pk, 0), recommended=recommended[pk])
+        for pk in Course.objects.values_list('pk', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_applicantsearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('applicants', models.PositiveIntegerField(default=0, help_text='Applicant profiles with this course_applied')),
+                ('recommended', models.PositiveIntegerField(default=0, help_text='Completed attempts recommending this course')),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistic', to='api.course')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResultStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('min_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('max_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='result_statistics', to='api.course')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_statistics', to='api.exam')),
+            ],
+            options={
+                'unique_together': {('exam', 'course')},
+            },
+        ),
+        migrations.RunPython(build_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_result_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='results_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever a completed result of this exam changes'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_exam_results_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever this question or one of its choices changes'),
+        ),
+        migrations.CreateModel(
+            name='ItemStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_version', models.PositiveIntegerField()),
+                ('responses', models.PositiveIntegerField(default=0, help_text='Completed attempts analysed')),
+                ('difficulty', models.DecimalField(blank=True, decimal_places=4, help_text='Share of attempts answering correctly', max_digits=5, null=True)),
+                ('discrimination', models.DecimalField(blank=True, decimal_places=4, help_text='Point-biserial correlation with the rest of the exam score', max_digits=5, null=True)),
+                ('omitted_rate', models.DecimalField(blank=True, decimal_places=4, max_digits=5, null=True)),
+                ('choice_rates', models.JSONField(default=list, help_text='Selection rate of every choice')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_statistics', to='api.question')),
+            ],
+            options={
+                'unique_together': {('question', 'question_version')},
+            },
+        ),
+    ]
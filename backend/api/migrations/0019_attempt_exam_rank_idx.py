@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_item_statistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='applicantexam',
+            index=models.Index(fields=['exam', 'status', '-recommendation_score', 'completed_at', 'id'], name='attempt_exam_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_attempt_exam_rank_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever this course changes, keys the course index of api/utils/course_index.py'),
+        ),
+    ]
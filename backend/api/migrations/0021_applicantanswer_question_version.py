@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:38
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def current_versions(apps, schema_editor):
+    # earlier answers are attributed to the version the question has now
+    Question = apps.get_model('api', 'Question')
+    ApplicantAnswer = apps.get_model('api', 'ApplicantAnswer')
+    ApplicantAnswer.objects.update(
+        question_version=Subquery(Question.objects.filter(pk=OuterRef('question_id')).values('version')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_course_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicantanswer',
+            name='question_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Question.version the answer was given to', null=True),
+        ),
+        migrations.RunPython(current_versions, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 
 
 #courses enrolled by students
@@ -6,6 +7,30 @@ class Course(models.Model):
     code = models.CharField(max_length=10, unique=True)
     name = models.CharField(max_length=100)
     min_score = models.DecimalField(max_digits=5, decimal_places=2, default=0, null=True, blank=True)
+    version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped whenever this course changes, keys the course index of api/utils/course_index.py")
+
+    def save(self, *args, **kwargs):
+        # version only moves with F() updates, a full save must not write back the value it loaded
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'version'
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_version(cls, course_id):
+        cls.objects.filter(pk=course_id).update(version=F('version') + 1)
 
     def __str__(self):
         return f"{self.code} - {self.name}"
+
+
+class CourseStatistic(models.Model):
+    """Per-course counters kept by api/utils/statistics.py for AdminCourseStatisticsView"""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name='statistic')
+    applicants = models.PositiveIntegerField(default=0, help_text="Applicant profiles with this course_applied")
+    recommended = models.PositiveIntegerField(default=0, help_text="Completed attempts recommending this course")
+
+    def __str__(self):
+        return f"{self.course.code} statistics"
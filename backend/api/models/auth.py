@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -24,6 +25,13 @@ EXAM_STATUS_CHOICES = [
     ('completed', 'Completed'),
 ]
 
+IMPORT_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
 class ApplicantProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     user_type = models.CharField(
@@ -54,4 +62,40 @@ class ApplicantProfile(models.Model):
     class Meta:
         verbose_name = "User Profile"
         verbose_name_plural = "User Profiles"
+        indexes = [
+            models.Index(fields=['user_type', 'created_at', 'id'], name='profile_created_idx'),
+        ]
         
+
+
+class ApplicantSearchToken(models.Model):
+    """One normalized word of a profile's name, email, contact number or school (see api/utils/search.py)"""
+    profile = models.ForeignKey(ApplicantProfile, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ('profile', 'token')
+        indexes = [models.Index(fields=['token', 'profile'], name='search_token_idx')]
+
+
+class TokenRevocation(models.Model):
+    """Tokens of the user issued up to revoked_at are refused (see api/utils/token_revocation.py)"""
+    # not a foreign key: the revocation has to outlive a deleted user
+    user_id = models.IntegerField(unique=True)
+    revoked_at = models.DateTimeField(db_index=True)
+
+
+class ApplicantImport(models.Model):
+    """A bulk applicant import run in the background; its report is polled (see api/utils/applicant_import.py)"""
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=IMPORT_STATUS_CHOICES, default='pending')
+    dry_run = models.BooleanField(default=False)
+    total = models.PositiveIntegerField(default=0)
+    # {'total', 'imported', 'dry_run', 'errors'} once done
+    report = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import of {self.total} applicant(s) ({self.status})"
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
@@ -12,6 +13,13 @@ EXAM_PROGRESS_CHOICES = [
     ('completed', 'Completed'),
 ]
 
+TICKET_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('waitlisted', 'Waitlisted'),
+    ('admitted', 'Admitted'),
+    ('rejected', 'Rejected'),
+]
+
 QUESTION_TYPES = [
     ('mcq', 'Multiple Choice'),
     ('essay', 'Essay'),
@@ -32,14 +40,56 @@ class Exam(models.Model):
     max_attempts = models.PositiveIntegerField(default=1, verbose_name="Max Attempts", help_text="Maximum number of allowed attempts")
     max_applicants = models.PositiveIntegerField(default=30, verbose_name="Max Applicants")
     is_expired = models.BooleanField(default=False, verbose_name="Is Expired", help_text="Marks whether the exam has expired")
+    content_version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped whenever a question or choice of this exam changes")
+    seats_taken = models.PositiveIntegerField(default=0, editable=False, help_text="Number of ApplicantExam rows holding a seat, kept by reserve_seat/release_seat")
+    results_version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped whenever a completed result of this exam changes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # only ever moved by F() updates (reserve_seat, bump_*_version), so a full
+    # save must not write back the values the instance was loaded with
+    COUNTER_FIELDS = ('content_version', 'seats_taken', 'results_version')
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(f"{self.title}-{uuid.uuid4().hex[:6]}")
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bump_content_version(cls, exam_id):
+        """Invalidates every cached artifact (paper, answer key) built from this exam"""
+        cls.objects.filter(pk=exam_id).update(content_version=F('content_version') + 1)
+
+    @classmethod
+    def bump_results_version(cls, exam_ids):
+        """Invalidates cached analytics (distribution, ranks) built from these exams' results"""
+        cls.objects.filter(pk__in=exam_ids).update(results_version=F('results_version') + 1)
+
+    @classmethod
+    def reserve_seat(cls, exam_id):
+        """
+        Takes a seat with one conditional UPDATE, so concurrent applicants can
+        never push seats_taken past max_applicants. Returns False if the exam is full.
+        Call inside the transaction that creates the ApplicantExam so a failed
+        insert gives the seat back.
+        """
+        return cls.objects.filter(
+            pk=exam_id, seats_taken__lt=F('max_applicants')
+        ).update(seats_taken=F('seats_taken') + 1) == 1
+
+    @classmethod
+    def release_seat(cls, exam_id):
+        cls.objects.filter(pk=exam_id, seats_taken__gt=0).update(seats_taken=F('seats_taken') - 1)
+
+    @property
+    def available_slots(self):
+        return max(self.max_applicants - self.seats_taken, 0)
+
     def __str__(self):
         return self.title
 
@@ -65,8 +115,14 @@ class Question(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES, default='mcq')
+    version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped whenever this question or one of its choices changes")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def bump_version(cls, question_id):
+        """Retires the item analysis stored for the previous version"""
+        cls.objects.filter(pk=question_id).update(version=F('version') + 1)
+
     @property
     def correct_choice(self):
         """Returns the correct choice for this question"""
@@ -119,6 +175,13 @@ class ApplicantExam(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination of the admin result lists
+            models.Index(fields=['status', '-completed_at', '-id'], name='attempt_completed_idx'),
+            models.Index(fields=['status', '-recommendation_score', '-completed_at', '-id'], name='attempt_ranked_idx'),
+            # per-exam rank order of api/utils/ranking.py
+            models.Index(fields=['exam', 'status', '-recommendation_score', 'completed_at', 'id'], name='attempt_exam_rank_idx'),
+        ]
 
     def __str__(self):
         return f"{self.applicant.user.get_full_name()} - {self.exam.title} (Attempt {self.exam_attempt_number})"
@@ -135,9 +198,9 @@ class ApplicantExam(models.Model):
             self.accuracy = self.recommendation_score
 
         # Determine recommended course(s) based on score
-        eligible_courses = Course.objects.filter(min_score__lte=self.recommendation_score).order_by('-min_score')
-        self.recommended_course = eligible_courses.first() if eligible_courses.exists() else None
-        self.save()
+        from api.utils.course_index import get_course_index
+        self.recommended_course = get_course_index().recommend(self.recommendation_score)
+        self.save(update_fields=['recommendation_score', 'accuracy', 'recommended_course'])
 
 
 class ApplicantAnswer(models.Model):
@@ -151,15 +214,20 @@ class ApplicantAnswer(models.Model):
     suspected_flag = models.BooleanField(default=False)
     tab_switch_count = models.PositiveIntegerField(default=0, verbose_name="Tab Switches")
     multiple_submission_flag = models.BooleanField(default=False, verbose_name="Multiple Submissions")
+    question_version = models.PositiveIntegerField(null=True, blank=True, help_text="Question.version the answer was given to")
 
     class Meta:
         unique_together = ('applicant_exam', 'question')
 
     def save(self, *args, **kwargs):
-        if self.selected_choice and self.question.correct_choice:
-            self.is_correct = self.selected_choice == self.question.correct_choice
-
-        if self.tab_switch_count > 3 or self.time_spent_seconds > 600:  # adjust threshold as needed
+        if self.selected_choice_id:
+            from api.utils.answer_key import get_answer_key
+            entry = get_answer_key(self.applicant_exam.exam).entry(self.selected_choice_id)
+            self.is_correct = entry.is_correct if entry else False
+            if entry:
+                self.question_version = entry.question_version
+
+        if self.tab_switch_count > 3 or (self.time_spent_seconds or 0) > 600:  # adjust threshold as needed
             self.suspected_flag = True
 
         super().save(*args, **kwargs)
@@ -168,6 +236,68 @@ class ApplicantAnswer(models.Model):
         return f"Answer to {self.question.text[:30]} - Correct: {self.is_correct}"
 
 
+
+
+class ResultStatistic(models.Model):
+    """
+    Completed attempts of one exam recommended one course (course NULL: no
+    course), kept incrementally by api/utils/statistics.py
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='result_statistics')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='result_statistics')
+    attempts = models.PositiveIntegerField(default=0)
+    score_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    max_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('exam', 'course')
+
+    def __str__(self):
+        return f"{self.exam.title} - {self.course or 'No course'} ({self.attempts})"
+
+class ItemStatistic(models.Model):
+    """
+    Item analysis of one version of a question over the exam's completed
+    attempts, computed by api/utils/item_analysis.py
+    """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='item_statistics')
+    question_version = models.PositiveIntegerField()
+    responses = models.PositiveIntegerField(default=0, help_text="Completed attempts analysed")
+    difficulty = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True, help_text="Share of attempts answering correctly")
+    discrimination = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True, help_text="Point-biserial correlation with the rest of the exam score")
+    omitted_rate = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True)
+    choice_rates = models.JSONField(default=list, help_text="Selection rate of every choice")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('question', 'question_version')
+
+    def __str__(self):
+        return f"{self.question} (v{self.question_version})"
+
+class AdmissionTicket(models.Model):
+    """
+    An apply request in an exam's FIFO admission queue, or on its waitlist
+    once the exam is full (see api/utils/admission.py)
+    """
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='admission_tickets')
+    applicant = models.ForeignKey(ApplicantProfile, on_delete=models.CASCADE, related_name='admission_tickets')
+    status = models.CharField(max_length=10, choices=TICKET_STATUS_CHOICES, default='pending')
+    applicant_exam = models.ForeignKey(ApplicantExam, on_delete=models.SET_NULL, null=True, blank=True)
+    detail = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['exam', 'status', 'id'])]
+
+    def __str__(self):
+        return f"{self.applicant} - {self.exam.title} ({self.status})"
+
+
 # new update v1
 # Added is_expired to Exam
 # Added max_attempts to Exam
@@ -1,27 +1,16 @@
 from rest_framework import permissions
+from api.authentication import user_type
 
 
+# roles come from the token claims when present (no user/profile query)
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and 
-            request.user.profile.user_type == 'admin'
-        )
+        return user_type(request.user) == 'admin'
 
 class IsSuperAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.user_type == 'superadmin'
-        )
+        return user_type(request.user) == 'superadmin'
 
 class IsApplicant(permissions.BasePermission):
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.user_type == 'applicant'
-        )
-
+        return user_type(request.user) == 'applicant'
@@ -3,6 +3,10 @@ from api.models.admission import Course
 from api.models.auth import ApplicantProfile
 from api.models.exam import *
 from django.utils import timezone
+from django.db import transaction
+from api.utils.course_index import get_course_index
+from api.utils.item_analysis import flags
+from api.utils.exam_import import create_questions
 
 # class ChoiceSerializer(serializers.ModelSerializer):
 #     class Meta:
@@ -67,6 +71,31 @@ class QuestionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ItemStatisticSerializer(serializers.ModelSerializer):
+    question_uuid = serializers.UUIDField(source='question.uuid', read_only=True)
+    question_text = serializers.CharField(source='question.text', read_only=True)
+    flags = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ItemStatistic
+        fields = [
+            'question_uuid',
+            'question_text',
+            'question_version',
+            'responses',
+            'difficulty',
+            'discrimination',
+            'omitted_rate',
+            'choice_rates',
+            'flags',
+            'computed_at',
+        ]
+        read_only_fields = fields
+
+    def get_flags(self, obj):
+        return flags(obj)
+
+
 class ExamSerializer(serializers.ModelSerializer):
     questions = QuestionSerializer(many=True, required=False)
 
@@ -81,16 +110,36 @@ class ExamSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         questions_data = validated_data.pop("questions", [])
-        exam = Exam.objects.create(**validated_data)
-
-        for question_data in questions_data:
-            choices_data = question_data.pop("choices", [])
-            question = Question.objects.create(exam=exam, **question_data)
-            for choice_data in choices_data:
-                Choice.objects.create(question=question, **choice_data)
+        with transaction.atomic():
+            exam = Exam.objects.create(**validated_data)
+            # two bulk INSERTs instead of one per question and choice
+            create_questions(exam, [
+                {
+                    'text': question_data['text'],
+                    'question_type': question_data.get('question_type', 'mcq'),
+                    'choices': [
+                        {'label': choice['label'], 'text': choice['text'], 'is_correct': choice.get('is_correct', False)}
+                        for choice in question_data.get('choices', [])
+                    ],
+                }
+                for question_data in questions_data
+            ])
 
         return exam
 
+class ExamSummarySerializer(serializers.ModelSerializer):
+    """Exam list representation: no nested questions, only their number (annotated by the view)"""
+    question_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Exam
+        fields = [
+            'uuid', 'slug', 'title', 'description', 'date',
+            'start_time', 'end_time', 'duration_minutes', 'access_code',
+            'is_active', 'question_count', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
 class ApplicantExamSerializer(serializers.ModelSerializer):
     exam_access_code = serializers.CharField(write_only=True)
     exam = ExamSerializer(read_only=True)
@@ -139,15 +188,21 @@ class ApplicantExamSerializer(serializers.ModelSerializer):
         attempt_num = ApplicantExam.objects.filter(applicant=applicant, exam=exam).count() + 1
 
 
-        applicant_exam = ApplicantExam(
-            exam=exam,
-            applicant=applicant,
-            started_at=timezone.now(),
-            status='in_progress',
-            total_questions=exam.questions.count(),
-            exam_attempt_number=attempt_num
-        )
-        applicant_exam.save()
+        with transaction.atomic():
+            if not Exam.reserve_seat(exam.pk):
+                raise serializers.ValidationError(
+                    f"This exam has reached the maximum number of applicants ({exam.max_applicants})."
+                )
+
+            applicant_exam = ApplicantExam(
+                exam=exam,
+                applicant=applicant,
+                started_at=timezone.now(),
+                status='in_progress',
+                total_questions=exam.questions.count(),
+                exam_attempt_number=attempt_num
+            )
+            applicant_exam.save()
         return applicant_exam
 
     def update(self, instance, validated_data):
@@ -168,7 +223,7 @@ class ApplicantExamSerializer(serializers.ModelSerializer):
             instance.recommendation_score = 0
             instance.accuracy = 0
 
-        recommended_course = Course.objects.filter(min_score__lte=instance.recommendation_score).order_by('-min_score').first()
+        recommended_course = get_course_index().recommend(instance.recommendation_score)
         
         # if recommended_course:
         #     instance.recommended_course = recommended_course
@@ -177,10 +232,13 @@ class ApplicantExamSerializer(serializers.ModelSerializer):
         #when course_applied to update automatically
         if recommended_course:
             instance.applicant.course_applied = recommended_course
-            instance.applicant.save()
-        
+            instance.applicant.save(update_fields=['course_applied', 'updated_at'])
         
-        instance.save()
+        # update_fields, so the statistics track the completion (api/signals.py)
+        instance.save(update_fields=[
+            'score', 'correct_answers', 'attempted_questions', 'completed_at', 'status',
+            'recommendation_score', 'accuracy',
+        ])
         return instance
 
 class ApplicantAnswerSerializer(serializers.ModelSerializer):
@@ -230,9 +288,8 @@ class ApplyUpcomingExamSerializer(serializers.ModelSerializer):
         if not exam.is_active or exam.is_expired:
             raise serializers.ValidationError("This exam is no longer available")
         
-        # Check if exam is full
-        applicant_count = ApplicantExam.objects.filter(exam=exam).count()
-        if applicant_count >= exam.max_applicants:
+        # Check if exam is full (early answer only, the seat is reserved in create)
+        if exam.seats_taken >= exam.max_applicants:
             raise serializers.ValidationError("This exam has reached maximum capacity")
         
         # Check if applicant already applied
@@ -247,18 +304,30 @@ class ApplyUpcomingExamSerializer(serializers.ModelSerializer):
         exam = Exam.objects.get(id=exam_id)
         applicant = self.context['request'].user.profile
         
-        applicant_exam = ApplicantExam.objects.create(
-            applicant=applicant,
-            exam=exam,
-            status='not_started',
-            total_questions=exam.questions.count()
-        )
+        with transaction.atomic():
+            if not Exam.reserve_seat(exam.pk):
+                raise serializers.ValidationError("This exam has reached maximum capacity")
+
+            applicant_exam = ApplicantExam.objects.create(
+                applicant=applicant,
+                exam=exam,
+                status='not_started',
+                total_questions=exam.questions.count()
+            )
         return applicant_exam
     
 
 class UpcomingExamSerializer(serializers.ModelSerializer):
+    """
+    is_applied: the applicant has an attempt at the exam, completed or not.
+    applicant_exam_uuid: their active (not started or in progress) attempt.
+    context['applied_exams'] ({exam uuid: active attempt uuid or None} for
+    every exam the applicant has an attempt at) and Exam.seats_taken avoid
+    per-row queries.
+    """
     available_slots = serializers.SerializerMethodField()
     is_applied = serializers.SerializerMethodField()
+    applicant_exam_uuid = serializers.SerializerMethodField()
     
     class Meta:
         model = Exam
@@ -275,13 +344,33 @@ class UpcomingExamSerializer(serializers.ModelSerializer):
             'max_applicants',
             'available_slots',
             'is_applied',
+            'applicant_exam_uuid',
         ]
     
     def get_available_slots(self, obj):
-        applicant_count = ApplicantExam.objects.filter(exam=obj).count()
-        return obj.max_applicants - applicant_count
+        return obj.available_slots
+    
+    def get_applicant_exam_uuid(self, obj):
+        applied = self.context.get('applied_exams')
+        if applied is not None:
+            return applied.get(str(obj.uuid))
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            try:
+                attempt_uuid = ApplicantExam.objects.filter(
+                    applicant=request.user.profile,
+                    exam=obj,
+                    status__in=['not_started', 'in_progress']
+                ).values_list('uuid', flat=True).first()
+                return str(attempt_uuid) if attempt_uuid else None
+            except:
+                return None
+        return None
     
     def get_is_applied(self, obj):
+        applied = self.context.get('applied_exams')
+        if applied is not None:
+            return str(obj.uuid) in applied
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             try:
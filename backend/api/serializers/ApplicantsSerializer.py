@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import F
-from api.models.exam import Exam, ApplicantExam, Question
+from api.models.exam import Exam, ApplicantExam, Question, AdmissionTicket
 from api.serializers.AdmissionSerializer import ExamSerializer
 from api.models.auth import ApplicantProfile
 from api.models.admission import Course
+from api.utils.course_index import get_course_index
 
 class ApplicantExamSerializer(serializers.ModelSerializer):
     exam_access_code = serializers.CharField(write_only=True)
@@ -30,26 +32,26 @@ class ApplicantExamSerializer(serializers.ModelSerializer):
         except Exam.DoesNotExist:
             raise serializers.ValidationError("Invalid or inactive access code.")
 
-        # Check max applicants dynamically from exam.max_applicants
-        current_applicants = ApplicantExam.objects.filter(exam=exam).count()
-        if current_applicants >= exam.max_applicants:
-            raise serializers.ValidationError(
-                f"This exam has reached the maximum number of applicants ({exam.max_applicants})."
-            )
-
         # Count previous attempts for this applicant
         attempt_num = ApplicantExam.objects.filter(applicant=applicant, exam=exam).count() + 1
 
-        # Create ApplicantExam instance
-        applicant_exam = ApplicantExam(
-            exam=exam,
-            applicant=applicant,
-            started_at=timezone.now(),
-            status='in_progress',
-            total_questions=exam.questions.count(),
-            exam_attempt_number=attempt_num
-        )
-        applicant_exam.save()
+        with transaction.atomic():
+            # Take a seat atomically, capped by exam.max_applicants
+            if not Exam.reserve_seat(exam.pk):
+                raise serializers.ValidationError(
+                    f"This exam has reached the maximum number of applicants ({exam.max_applicants})."
+                )
+
+            # Create ApplicantExam instance
+            applicant_exam = ApplicantExam(
+                exam=exam,
+                applicant=applicant,
+                started_at=timezone.now(),
+                status='in_progress',
+                total_questions=exam.questions.count(),
+                exam_attempt_number=attempt_num
+            )
+            applicant_exam.save()
         return applicant_exam
 
 
@@ -76,28 +78,26 @@ class StartExamSerializer(serializers.ModelSerializer):
         except Exam.DoesNotExist:
             raise serializers.ValidationError("Invalid or inactive access code.")
 
-
-        current_applicants = ApplicantExam.objects.filter(exam=exam).count()
-        if current_applicants >= exam.max_applicants:
-            raise serializers.ValidationError(
-                f"This exam has reached the maximum number of applicants ({exam.max_applicants})."
-            )
-
-
         attempt_num = ApplicantExam.objects.filter(applicant=applicant, exam=exam).count() + 1
         if attempt_num > exam.max_attempts:
             raise serializers.ValidationError(
                 f"You have reached the maximum allowed attempts ({exam.max_attempts}) for this exam."
             )
 
-        applicant_exam = ApplicantExam.objects.create(
-            exam=exam,
-            applicant=applicant,
-            started_at=timezone.now(),
-            status="in_progress",
-            total_questions=exam.questions.count(),
-            exam_attempt_number=attempt_num
-        )
+        with transaction.atomic():
+            if not Exam.reserve_seat(exam.pk):
+                raise serializers.ValidationError(
+                    f"This exam has reached the maximum number of applicants ({exam.max_applicants})."
+                )
+
+            applicant_exam = ApplicantExam.objects.create(
+                exam=exam,
+                applicant=applicant,
+                started_at=timezone.now(),
+                status="in_progress",
+                total_questions=exam.questions.count(),
+                exam_attempt_number=attempt_num
+            )
 
         return applicant_exam
     
@@ -138,6 +138,10 @@ class ApplicantProfileSerializer(serializers.ModelSerializer):
             return obj.profile_photo.url
         return None
 
+class ExamFull(serializers.ValidationError):
+    """No seat is left (or the waitlist is ahead), callers may offer the waitlist instead"""
+
+
 class ApplyUpcomingExamSerializer(serializers.ModelSerializer):
     exam_uuid = serializers.UUIDField(write_only=True)
 
@@ -175,16 +179,43 @@ class ApplyUpcomingExamSerializer(serializers.ModelSerializer):
         if attempt_number > exam.max_attempts:
             raise serializers.ValidationError("You have reached the maximum allowed attempts for this exam.")
 
-        applicant_exam = ApplicantExam.objects.create(
-            applicant=applicant,
-            exam=exam,
-            started_at=None,
-            status='not_started',
-            total_questions=exam.questions.count(),
-            exam_attempt_number=attempt_number
-        )
+        # seats freed while people are waitlisted belong to the waitlist
+        if AdmissionTicket.objects.filter(exam=exam, status='waitlisted').exists():
+            raise ExamFull("This exam has reached maximum capacity.")
+
+        with transaction.atomic():
+            if not Exam.reserve_seat(exam.pk):
+                raise ExamFull("This exam has reached maximum capacity.")
+
+            applicant_exam = ApplicantExam.objects.create(
+                applicant=applicant,
+                exam=exam,
+                started_at=None,
+                status='not_started',
+                total_questions=exam.questions.count(),
+                exam_attempt_number=attempt_number
+            )
         return applicant_exam
 
+class AdmissionTicketSerializer(serializers.ModelSerializer):
+    exam_uuid = serializers.UUIDField(source='exam.uuid', read_only=True)
+    applicant_exam_uuid = serializers.UUIDField(source='applicant_exam.uuid', read_only=True, allow_null=True)
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AdmissionTicket
+        fields = [
+            'uuid', 'exam_uuid', 'status', 'detail', 'applicant_exam_uuid',
+            'position', 'created_at', 'processed_at'
+        ]
+        read_only_fields = fields
+
+    def get_position(self, obj):
+        # tickets ahead of this one in its queue, an index range count on (exam, status, id)
+        if obj.status not in ('pending', 'waitlisted'):
+            return None
+        return AdmissionTicket.objects.filter(exam_id=obj.exam_id, status=obj.status, id__lt=obj.id).count()
+
 class UpcomingExamSerializer(serializers.ModelSerializer):
     applicant_count = serializers.IntegerField(read_only=True)
     is_applied = serializers.SerializerMethodField()
@@ -210,20 +241,13 @@ class UpcomingExamSerializer(serializers.ModelSerializer):
         ]
     
     def get_is_applied(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                applicant = request.user.profile
-                return ApplicantExam.objects.filter(
-                    applicant=applicant,
-                    exam=obj,
-                    status__in=['not_started', 'in_progress']
-                ).exists()
-            except:
-                return False
-        return False
+        return self.get_applicant_exam_uuid(obj) is not None
     
     def get_applicant_exam_uuid(self, obj):
+        # same per-request map as AdmissionSerializer.UpcomingExamSerializer, None for inactive attempts
+        applied = self.context.get('applied_exams')
+        if applied is not None:
+            return applied.get(str(obj.uuid))
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             try:
@@ -274,7 +298,7 @@ class ApplicantExamSummarySerializer(serializers.ModelSerializer):
         # Skip if recommendation_score is None
         if obj.recommendation_score is None:
             return []
-        courses = Course.objects.filter(min_score__lte=obj.recommendation_score).order_by('-min_score')
+        courses = get_course_index().eligible(obj.recommendation_score)
         return [
             {'code': c.code, 'name': c.name, 'min_score': float(c.min_score)}
             for c in courses
@@ -327,15 +351,14 @@ class ApplicantExamHistorySerializer(serializers.ModelSerializer):
 
 
 class TakeExamSerializer(serializers.ModelSerializer):
+    """Attempt-specific part of the take-exam payload; questions come from the cached exam paper"""
     exam_details = serializers.SerializerMethodField()
-    questions = serializers.SerializerMethodField()
     
     class Meta:
         model = ApplicantExam
         fields = [
             'uuid',
             'exam_details',
-            'questions',
             'started_at',
             'status',
             'total_questions',
@@ -352,26 +375,6 @@ class TakeExamSerializer(serializers.ModelSerializer):
             'duration_minutes': obj.exam.duration_minutes,
             'total_questions': obj.total_questions,
         }
-    
-    def get_questions(self, obj):
-        questions = obj.exam.questions.all()
-        result = []
-        for question in questions:
-            choices = question.choices.all()
-            result.append({
-                'uuid': str(question.uuid),
-                'text': question.text,
-                'question_type': question.question_type,
-                'choices': [
-                    {
-                        'uuid': str(choice.uuid),
-                        'label': choice.label,
-                        'text': choice.text,
-                    }
-                    for choice in choices
-                ]
-            })
-        return result
 
 
 class SubmitAnswerSerializer(serializers.Serializer):
@@ -379,74 +382,120 @@ class SubmitAnswerSerializer(serializers.Serializer):
     choice_uuid = serializers.UUIDField()
     time_spent_seconds = serializers.IntegerField(required=False, default=0)
     
-    def validate_question_uuid(self, value):
-        from api.models.exam import Question
-        try:
-            Question.objects.get(uuid=value)
-        except Question.DoesNotExist:
-            raise serializers.ValidationError("Question does not exist")
-        return value
-    
-    def validate_choice_uuid(self, value):
-        from api.models.exam import Choice
-        try:
-            Choice.objects.get(uuid=value)
-        except Choice.DoesNotExist:
-            raise serializers.ValidationError("Choice does not exist")
-        return value
+    def validate(self, data):
+        from api.utils.answer_key import get_answer_key
+
+        applicant_exam = self.context['applicant_exam']
+        entry = get_answer_key(applicant_exam.exam).lookup(data['question_uuid'], data['choice_uuid'])
+        if entry is None:
+            raise serializers.ValidationError({'choice_uuid': 'Choice does not exist for this question'})
+        data['entry'] = entry
+        return data
     
     def create(self, validated_data):
-        from api.models.exam import Question, Choice, ApplicantAnswer
+        from django.db import IntegrityError, transaction
+        from api.models.exam import ApplicantAnswer
         
         applicant_exam = self.context['applicant_exam']
-        question = Question.objects.get(uuid=validated_data['question_uuid'])
-        choice = Choice.objects.get(uuid=validated_data['choice_uuid'])
+        entry = validated_data['entry']
+        lookup = {'applicant_exam': applicant_exam, 'question_id': entry.question_id}
         
-        # Check if answer already exists
-        answer, created = ApplicantAnswer.objects.update_or_create(
-            applicant_exam=applicant_exam,
-            question=question,
-            defaults={
-                'selected_choice': choice,
-                'is_correct': choice.is_correct,
-                'time_spent_seconds': validated_data.get('time_spent_seconds', 0),
-            }
-        )
-        
-        # Update attempted questions count
-        if created:
-            applicant_exam.attempted_questions += 1
-        
-        # Update correct answers count
-        if answer.is_correct:
+        with transaction.atomic():
+            # lock the attempt first, like the bulk path: concurrent submissions for it
+            # queue here, while locking an answer row that does not exist yet takes an
+            # InnoDB gap lock on which two first submissions deadlock
+            ApplicantExam.objects.select_for_update().filter(pk=applicant_exam.pk).exists()
+            answer = ApplicantAnswer.objects.filter(**lookup).first()
+            created = answer is None
+            if created:
+                try:
+                    with transaction.atomic():
+                        answer = ApplicantAnswer(
+                            selected_choice_id=entry.choice_id,
+                            time_spent_seconds=validated_data.get('time_spent_seconds', 0),
+                            **lookup
+                        )
+                        answer.save()
+                except IntegrityError:
+                    # inserted by a writer that does not lock the attempt (admin, journal flush)
+                    answer = ApplicantAnswer.objects.select_for_update().get(**lookup)
+                    created = False
+            
+            previous_correct = False
             if not created:
-                # If updating, check if previous answer was incorrect
-                previous_answer = ApplicantAnswer.objects.filter(
-                    applicant_exam=applicant_exam,
-                    question=question
-                ).first()
-                if previous_answer and not previous_answer.is_correct:
-                    applicant_exam.correct_answers += 1
-            else:
-                applicant_exam.correct_answers += 1
+                previous_correct = answer.is_correct
+                answer.applicant_exam = applicant_exam
+                answer.selected_choice_id = entry.choice_id
+                answer.time_spent_seconds = validated_data.get('time_spent_seconds', 0)
+                answer.save(update_fields=['selected_choice', 'is_correct', 'question_version', 'time_spent_seconds', 'suspected_flag'])
+            
+            # apply only the change this answer made, never a value computed in Python
+            attempted_delta = 1 if created else 0
+            correct_delta = int(answer.is_correct) - int(previous_correct)
+            if attempted_delta or correct_delta:
+                ApplicantExam.objects.filter(pk=applicant_exam.pk).update(
+                    attempted_questions=F('attempted_questions') + attempted_delta,
+                    correct_answers=F('correct_answers') + correct_delta,
+                )
         
-        applicant_exam.save()
+        applicant_exam.refresh_from_db(fields=['attempted_questions', 'correct_answers'])
         return answer
 
 
+class AnswerItemSerializer(serializers.Serializer):
+    question_uuid = serializers.UUIDField()
+    choice_uuid = serializers.UUIDField()
+    time_spent_seconds = serializers.IntegerField(required=False, default=0, min_value=0)
+
+
+class SubmitAnswersSerializer(serializers.Serializer):
+    """Bulk variant of SubmitAnswerSerializer: validates and writes a whole batch at once"""
+    answers = AnswerItemSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, value):
+        from api.utils.answer_key import get_answer_key
+
+        answer_key = get_answer_key(self.context['applicant_exam'].exam)
+        errors = []
+        for item in value:
+            entry = answer_key.lookup(item['question_uuid'], item['choice_uuid'])
+            if entry is None:
+                errors.append({'choice_uuid': ['Choice does not exist for this question']})
+            else:
+                errors.append({})
+                item['entry'] = entry
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
+
+    def create(self, validated_data):
+        from django.db import transaction
+        from api.utils.answers import upsert_answers, recount_answers
+
+        applicant_exam = self.context['applicant_exam']
+        rows = [
+            {
+                'question_id': item['entry'].question_id,
+                'choice_id': item['entry'].choice_id,
+                'is_correct': item['entry'].is_correct,
+                'question_version': item['entry'].question_version,
+                'time_spent_seconds': item['time_spent_seconds'],
+            }
+            for item in validated_data['answers']
+        ]
+
+        with transaction.atomic():
+            # serialize concurrent batches for the same attempt
+            ApplicantExam.objects.select_for_update().filter(pk=applicant_exam.pk).exists()
+            created, updated = upsert_answers(applicant_exam.pk, rows)
+            recount_answers([applicant_exam.pk])
+
+        applicant_exam.refresh_from_db(fields=['attempted_questions', 'correct_answers'])
+        return {'created': created, 'updated': updated}
+
+
 class CompleteExamSerializer(serializers.Serializer):
     def save(self):
-        applicant_exam = self.context['applicant_exam']
-        applicant_exam.status = 'completed'
-        applicant_exam.completed_at = timezone.now()
-        applicant_exam.calculate_recommendation_score()
-        applicant_exam.save()
-        
-        # Update applicant profile
-        applicant = applicant_exam.applicant
-        applicant.exam_status = 'completed'
-        applicant.exam_score = applicant_exam.recommendation_score
-        applicant.save()
-        
-        return applicant_exam
-    
\ No newline at end of file
+        from api.utils.grading import grade_attempt
+
+        return grade_attempt(self.context['applicant_exam'])
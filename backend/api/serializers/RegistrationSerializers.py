@@ -2,6 +2,7 @@ from rest_framework import serializers
 from api.models.auth import ApplicantProfile
 from api.models.admission import Course
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
 
 class RegisterSerializer(serializers.Serializer):
     # User fields
@@ -55,3 +56,19 @@ class RegisterSerializer(serializers.Serializer):
             "high_school": instance.high_school,
             "year_graduated": instance.year_graduated,
         }
+
+
+class ApplicantImportRowSerializer(RegisterSerializer):
+    """One row of a bulk import, uniqueness is checked for the whole batch (api/utils/applicant_import.py)"""
+    # bulk_create skips the model validation, so the column limits are checked here
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    first_name = serializers.CharField(max_length=150)
+    last_name = serializers.CharField(max_length=150)
+    user_type = serializers.ChoiceField(choices=[('applicant', 'Applicant')], default='applicant')
+    contact_number = serializers.CharField(max_length=15, required=False, allow_blank=True)
+    high_school = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    year_graduated = serializers.IntegerField(min_value=0, max_value=9999, required=False)
+
+    def validate(self, data):
+        return data
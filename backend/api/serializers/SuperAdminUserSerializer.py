@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from api.models.auth import ApplicantProfile
+from api.models.auth import ApplicantProfile, ApplicantImport
 from api.models.admission import Course
 
 
@@ -187,4 +187,10 @@ class SuperAdminUserCreateSerializer(serializers.ModelSerializer):
 class CourseSerializers(serializers.ModelSerializer):
     class Meta:
         model = Course
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class ApplicantImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ApplicantImport
+        fields = ['uuid', 'status', 'dry_run', 'total', 'report', 'created_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,62 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, update_last_login
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.models.auth import ApplicantProfile
+from api.utils import login_pool
+from api.utils.token_revocation import is_revoked
+
+_unknown_user_password = None
+
+
+def unknown_user_password():
+    # verified against for unknown usernames, so they take as long as a wrong password
+    global _unknown_user_password
+    if _unknown_user_password is None:
+        _unknown_user_password = make_password('unknown-user')
+    return _unknown_user_password
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Adds the user_type and profile_id claims read by ClaimsJWTAuthentication.
+    The password is checked through api/utils/login_pool.py rather than
+    authenticate(), with the same outcome as ModelBackend.
+    """
+
+    def validate(self, attrs):
+        username = attrs[self.username_field]
+        user = User.objects.filter(**{User.USERNAME_FIELD: username}).first()
+        correct, upgraded = login_pool.check(
+            username, attrs['password'], user.password if user else unknown_user_password()
+        )
+        if user is None or not correct or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+
+        self.user = user
+        refresh = self.get_token(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        profile = ApplicantProfile.objects.filter(user=user).values_list('pk', 'user_type').first()
+        token['profile_id'], token['user_type'] = profile or (None, None)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh tokens issued before a revocation must log in again, so the claims are current"""
+
+    def validate(self, attrs):
+        if is_revoked(RefreshToken(attrs['refresh'])):
+            raise InvalidToken("Token has been revoked.")
+        return super().validate(attrs)
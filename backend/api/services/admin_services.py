@@ -1,9 +1,14 @@
+import io
+import json
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth.models import User
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from django.db import models
+from django.db.models import Count
+from django.utils import timezone
 #permissions 
 from rest_framework.permissions import IsAuthenticated, AllowAny
 #permissions
@@ -23,7 +28,7 @@ from api.models.exam import (
     Choice,
     ApplicantExam,
     ApplicantAnswer,
-    
+    ItemStatistic,
 )
 
 #serializers
@@ -32,7 +37,9 @@ from api.serializers.AdmissionSerializer import (
     CourseSerializers,
     ChoiceSerializer,
     QuestionSerializer,
+    ItemStatisticSerializer,
     ExamSerializer,
+    ExamSummarySerializer,
     ApplicantExamSerializer,
     ApplicantAnswerSerializer,
     AdminResultSerializer,
@@ -44,8 +51,21 @@ from api.serializers.SuperAdminUserSerializer import(
     SuperAdminUserSerializer
 )
 
-class AdminApplicantsViewSet(viewsets.ModelViewSet):
+from api.utils.grading import regrade_exam
+from api.pagination import KeysetPagination
+from api.fieldsets import SparseFieldsetMixin
+from api.utils import exports
+from api.utils.search import apply_search
+from api.utils.statistics import result_statistics, course_statistics
+from api.utils import distribution
+from api.utils import item_analysis
+from api.utils import ranking
+from api.utils import exam_import
+
+class AdminApplicantsViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = SuperAdminUserSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ['created_at', 'id']
     permission_classes = [IsAdmin, IsAuthenticated]
     
     def get_queryset(self):
@@ -57,34 +77,105 @@ class AdminApplicantsViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(is_verified=True)
             if is_verified_param.lower() == 'false':
                 queryset = queryset.filter(is_verified = False)
-        return queryset
+
+        # Search by name, email, contact number or school
+        return apply_search(self, queryset)
 
 #manage exams
-class ChoiceView(viewsets.ModelViewSet):
+class RegradeMixin:
+    """Regrades stored results when an edit changes an exam's answer key"""
+    regrade_report = None
+
+    def regrade(self, exam_id):
+        if ApplicantExam.objects.filter(exam_id=exam_id).exists():
+            self.regrade_report = regrade_exam(Exam.objects.get(pk=exam_id))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.regrade_report is not None and isinstance(getattr(response, 'data', None), dict):
+            response.data['regrade'] = self.regrade_report
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ChoiceView(SparseFieldsetMixin, RegradeMixin, viewsets.ModelViewSet):
     queryset = Choice.objects.all()
     serializer_class = ChoiceSerializer
     permission_classes = [AllowAny]
     lookup_field = "uuid"
+
+    def perform_create(self, serializer):
+        choice = serializer.save()
+        if choice.is_correct:
+            self.regrade(choice.question.exam_id)
+
+    def perform_update(self, serializer):
+        was_correct = serializer.instance.is_correct
+        choice = serializer.save()
+        if choice.is_correct != was_correct:
+            self.regrade(choice.question.exam_id)
+
+    def perform_destroy(self, instance):
+        # answers that selected this choice are nulled, so they stop counting
+        exam_id = instance.question.exam_id
+        instance.delete()
+        self.regrade(exam_id)
     
-class QuestionView(viewsets.ModelViewSet):
+class QuestionView(SparseFieldsetMixin, RegradeMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
+    expandable_fields = {'choices': ['choices']}
     permission_classes = [AllowAny]
     lookup_field = "uuid"
 
+    def perform_create(self, serializer):
+        # a new question joins every attempt's denominator
+        question = serializer.save()
+        self.regrade(question.exam_id)
+
+    def perform_destroy(self, instance):
+        exam_id = instance.exam_id
+        instance.delete()
+        self.regrade(exam_id)
+
     @action(detail=True, methods=["post"], url_path="choices")
     def create_choice(self, request, uuid=None):
         question = self.get_object()
         serializer = ChoiceSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(question=question)
+        choice = serializer.save(question=question)
+        if choice.is_correct:
+            self.regrade(question.exam_id)
         return Response(serializer.data)
 
-class ExamView(viewsets.ModelViewSet):
+    @action(detail=True, methods=["get"], permission_classes=[IsAdmin, IsAuthenticated])
+    def analysis(self, request, uuid=None):
+        """Stored item analysis of the question's current version, for the question editor"""
+        question = self.get_object()
+        item = ItemStatistic.objects.filter(question=question, question_version=question.version).first()
+        if item is None:
+            return Response({'detail': 'This version of the question has not been analysed yet.'}, status=404)
+        return Response(ItemStatisticSerializer(item).data)
+
+class ExamView(SparseFieldsetMixin, RegradeMixin, viewsets.ModelViewSet):
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
     permission_classes = [AllowAny]
     lookup_field = "uuid"
+    expandable_fields = {'questions': ['questions__choices']}
+
+    def summarized(self):
+        # the list shows question counts unless ?expand=questions asks for the questions
+        return self.action == 'list' and 'questions' not in self.expansions()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.summarized():
+            queryset = queryset.annotate(question_count=Count('questions'))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.summarized():
+            return ExamSummarySerializer
+        return super().get_serializer_class()
 
     @action(detail=True, methods=["post"], url_path="questions")
     def create_question(self, request, uuid=None):
@@ -92,26 +183,73 @@ class ExamView(viewsets.ModelViewSet):
         serializer = QuestionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(exam=exam)
+        self.regrade(exam.pk)
         return Response(serializer.data)
 
-class ApplicantExamView(viewsets.ModelViewSet):
+    @action(detail=True, methods=["post"], url_path="import", parser_classes=[MultiPartParser, JSONParser], permission_classes=[IsAdmin, IsAuthenticated])
+    def import_questions(self, request, uuid=None):
+        """
+        Adds a question bank to the exam from an uploaded 'file' (JSON, CSV or
+        GIFT-like text, see api/utils/exam_import.py; ?file_type= or the file
+        extension) or a JSON body. Nothing is saved unless every question is valid.
+        """
+        exam = self.get_object()
+        upload = request.FILES.get('file')
+        try:
+            if upload is None:
+                questions = exam_import.json_questions(request.data)
+            else:
+                file_type = request.query_params.get('file_type') or upload.name.rsplit('.', 1)[-1].lower()
+                if file_type not in exam_import.FILE_TYPES:
+                    return Response({'detail': 'file_type must be json, csv or gift.'}, status=400)
+                if file_type == 'json':
+                    questions = exam_import.json_questions(json.load(upload))
+                else:
+                    # parsed line by line as it is read
+                    questions = exam_import.read_questions(io.TextIOWrapper(upload.file, encoding='utf-8-sig'), file_type)
+        except (ValueError, UnicodeDecodeError) as error:
+            return Response({'detail': f'Could not read the questions: {error}'}, status=400)
+
+        errors = exam_import.validate(questions)
+        if errors:
+            return Response({'detail': 'No question was imported.', 'errors': errors}, status=400)
+        imported = exam_import.create_questions(exam, questions)
+        self.regrade(exam.pk)
+        return Response({'imported': imported, 'total_questions': exam.questions.count()}, status=201)
+
+    @action(detail=True, methods=["get", "post"], url_path="item-analysis", permission_classes=[IsAdmin, IsAuthenticated])
+    def item_analysis(self, request, uuid=None):
+        """GET: stored item analysis of the exam's questions, POST: recompute it first"""
+        exam = self.get_object()
+        if request.method == "POST":
+            items = item_analysis.analyze_exam(exam)
+        else:
+            items = item_analysis.current_statistics(exam)
+        return Response(ItemStatisticSerializer(items, many=True).data)
+
+class ApplicantExamView(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = ApplicantExam.objects.all()
     serializer_class = ApplicantExamSerializer
+    expandable_fields = {'exam': ['exam__questions__choices']}
     permission_classes = [IsAdmin, IsAuthenticated]
     lookup_field = 'uuid'
 
-class ApplicantAnswerView(viewsets.ModelViewSet):
+class ApplicantAnswerView(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = ApplicantAnswer.objects.all()
     serializer_class = ApplicantAnswerSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ['id']
     permission_classes = [IsAdmin, IsAuthenticated] 
     lookup_field = 'uuid' 
 
-class UsersView(viewsets.ModelViewSet):    
+class UsersView(SparseFieldsetMixin, viewsets.ModelViewSet):    
     queryset = ApplicantProfile.objects.all()
     serializer_class = UserSerializers
+    pagination_class = KeysetPagination
+    keyset_ordering = ['id']
     permission_classes = [IsAdmin, IsAuthenticated]
 
-class CoursesView(viewsets.ModelViewSet):
+class CoursesView(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializers
     permission_classes = [IsAdmin, IsAuthenticated]
@@ -135,27 +273,15 @@ class AdminCourseStatisticsView(APIView):
     permission_classes = [IsAdmin, IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
-        from django.db.models import Count, Q
-        
-        courses = Course.objects.annotate(
-            total_applicants=Count(
-                'applicantprofile',
-                filter=Q(applicantprofile__user_type='applicant'),
-                distinct=True
-            ),
-            recommended_count=Count(
-                'recommended_exams',
-                filter=Q(recommended_exams__status='completed'),
-                distinct=True
-            )
-        ).values('name', 'total_applicants', 'recommended_count')
-        
-        return Response(list(courses))
+        # counters maintained by api/utils/statistics.py, one row per course
+        return Response(course_statistics())
 
 
 #results
-class AdminViewResultsViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminViewResultsViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = AdminDetailedResultSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-completed_at', '-id']
     permission_classes = [IsAdmin, IsAuthenticated]
     lookup_field = 'uuid'
     
@@ -193,23 +319,24 @@ class AdminViewResultsViewSet(viewsets.ReadOnlyModelViewSet):
             elif status == 'failed':
                 queryset = queryset.filter(recommended_course__isnull=True)
         
-        # Search by applicant name or email
-        search = self.request.query_params.get('search')
-        if search:
-            from django.db.models import Q
-            queryset = queryset.filter(
-                Q(applicant__user__first_name__icontains=search) |
-                Q(applicant__user__last_name__icontains=search) |
-                Q(applicant__user__email__icontains=search)
-            )
-        
-        return queryset
+        # Search by applicant name, email, contact number or school
+        return apply_search(self, queryset, 'applicant_id')
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get overall statistics for results"""
         from django.db.models import Avg, Count, Max, Min
-        
+
+        # exam/course/status are answered from the materialized statistics,
+        # score ranges and search fall back to aggregating the attempts
+        params = request.query_params
+        if not any(params.get(name) for name in ('min_score', 'max_score', 'search')):
+            return Response(result_statistics(
+                exam_uuid=params.get('exam'),
+                course_id=params.get('course'),
+                status=params.get('status'),
+            ))
+
         queryset = self.get_queryset()
         
         stats = queryset.aggregate(
@@ -233,10 +360,78 @@ class AdminViewResultsViewSet(viewsets.ReadOnlyModelViewSet):
             'statistics': stats,
             'course_distribution': list(course_distribution),
         })
+
+    @action(detail=False, methods=['get'])
+    def distribution(self, request):
+        """
+        Score histogram (?bins=, default 10), quantiles and summary of the
+        filtered results. ?ranks=true adds each attempt's percentile rank.
+        """
+        try:
+            bins = int(request.query_params.get('bins', distribution.DEFAULT_BINS))
+        except ValueError:
+            return Response({'detail': 'bins must be a number.'}, status=400)
+        bins = min(max(bins, 1), distribution.MAX_BINS)
+        ranks = request.query_params.get('ranks', '').lower() in ('1', 'true', 'yes')
+
+        return Response(distribution.score_distribution(
+            self.get_queryset(), request.query_params.dict(), bins=bins, ranks=ranks
+        ))
+
+    @action(detail=False, methods=['get'])
+    def leaderboard(self, request):
+        """
+        Top ?limit= (default 10) results of ?exam= (or of every exam),
+        optionally only those recommended ?course=
+        """
+        params = request.query_params
+        exam_id = None
+        if params.get('exam'):
+            exam_id = Exam.objects.filter(uuid=params['exam']).values_list('pk', flat=True).first()
+            if exam_id is None:
+                return Response({'detail': 'Exam does not exist.'}, status=404)
+        try:
+            limit = int(params.get('limit', ranking.DEFAULT_LIMIT))
+            course_id = int(params['course']) if params.get('course') else None
+        except ValueError:
+            return Response({'detail': 'limit and course must be numbers.'}, status=400)
+        limit = min(max(limit, 1), ranking.MAX_LIMIT)
+
+        return Response([
+            {**rank, **AdminResultSerializer(attempt).data}
+            for rank, attempt in ranking.leaderboard(exam_id, course_id, limit)
+        ])
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams the filtered results as a spreadsheet, ?file_type=csv (default)
+        or xlsx. ?answers=true adds the selected choice per question and needs ?exam=.
+        """
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in ('csv', 'xlsx'):
+            return Response({'detail': 'file_type must be csv or xlsx.'}, status=400)
+
+        exam = None
+        if request.query_params.get('answers', '').lower() in ('1', 'true', 'yes'):
+            exam = Exam.objects.filter(uuid=request.query_params.get('exam') or None).first()
+            if exam is None:
+                return Response({'detail': 'Per-question answers need an exam filter.'}, status=400)
+
+        rows = exports.result_rows(self.get_queryset().order_by('-completed_at', '-id'), exam=exam)
+        filename = f"exam-results-{timezone.now():%Y%m%d-%H%M}.{file_type}"
+        if file_type == 'csv':
+            return exports.csv_response(rows, filename)
+        try:
+            return exports.xlsx_response(rows, filename)
+        except ImportError:
+            return Response({'detail': 'XLSX export needs openpyxl installed.'}, status=501)
     
     
-class AdminPassedApplicantsViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminPassedApplicantsViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = AdminResultSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-recommendation_score', '-completed_at', '-id']
     permission_classes = [IsAdmin, IsAuthenticated]
     lookup_field = 'uuid'
     
@@ -262,8 +457,10 @@ class AdminPassedApplicantsViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
     
 
-class AdminFailedApplicantsViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminFailedApplicantsViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = AdminResultSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-completed_at', '-id']
     permission_classes = [IsAdmin, IsAuthenticated]
     lookup_field = 'uuid'
     
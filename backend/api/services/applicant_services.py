@@ -4,9 +4,16 @@ from django.db.models import Count, F
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated , AllowAny
 from rest_framework.response import Response
+from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from api.models.exam import Exam, ApplicantExam
+from django.db import transaction
+from api.models.exam import Exam, ApplicantExam, AdmissionTicket
 from api.permissions import IsApplicant
+from api.authentication import profile_id
+from api.utils.exam_paper import get_exam_paper, render_with_paper
+from api.utils import answer_journal, admission, ranking
 from api.serializers.AdmissionSerializer import (
     UpcomingExamSerializer,
     RecentApplicantExamSerializer
@@ -16,15 +23,26 @@ from api.serializers.ApplicantsSerializer import (
     ApplicantProfileSerializer,
     ApplicantExamSummarySerializer,
     ApplyUpcomingExamSerializer,
+    ExamFull,
+    AdmissionTicketSerializer,
     ApplicantExamHistorySerializer,
     TakeExamSerializer,
     SubmitAnswerSerializer,
+    SubmitAnswersSerializer,
     CompleteExamSerializer,
     
 )
 
 from api.models.auth import ApplicantProfile
 
+def ticket_response(data, ticket, status_code=status.HTTP_200_OK):
+    # tells a client following a waiting ticket when to poll again
+    response = Response(data, status=status_code)
+    seconds = admission.retry_after(ticket)
+    if seconds is not None:
+        response['Retry-After'] = str(seconds)
+    return response
+
 class UpcomingExamView(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated, IsApplicant]
     serializer_class = UpcomingExamSerializer
@@ -32,34 +50,114 @@ class UpcomingExamView(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         today = timezone.now().date()
-        return Exam.objects.filter(
+        exams = Exam.objects.filter(
             is_active=True,
             is_expired=False,
             date__gte=today
-        ).annotate(
-            applicant_count=Count('applicantexam')
-        ).filter(applicant_count__lt=F('max_applicants')).order_by('date')
+        )
+        if self.action in ('apply', 'cancel'):
+            # full exams can still be joined through their waitlist
+            return exams
+        return exams.filter(seats_taken__lt=F('max_applicants')).annotate(
+            applicant_count=F('seats_taken')
+        ).order_by('date')
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    def list(self, request, *args, **kwargs):
+        # the exam list itself is the same for every applicant, cache it briefly
+        cache_key = f"upcoming_exams:{timezone.now().date()}"
+        exams = cache.get(cache_key)
+        if exams is None:
+            serializer = self.get_serializer(self.get_queryset(), many=True, context={'applied_exams': {}})
+            exams = [dict(exam) for exam in serializer.data]
+            cache.set(cache_key, exams, getattr(settings, 'UPCOMING_EXAMS_CACHE_SECONDS', 5))
+
+        # one query for this applicant's attempts across all listed exams
+        applied = {}
+        for exam_uuid, attempt_uuid, attempt_status in ApplicantExam.objects.filter(
+            applicant_id=profile_id(request.user),
+            exam__uuid__in=[exam['uuid'] for exam in exams],
+        ).values_list('exam__uuid', 'uuid', 'status'):
+            applied.setdefault(str(exam_uuid), None)
+            if attempt_status in ('not_started', 'in_progress'):
+                applied[str(exam_uuid)] = str(attempt_uuid)
+        return Response([
+            {
+                **exam,
+                # any attempt, completed ones included
+                'is_applied': exam['uuid'] in applied,
+                'applicant_exam_uuid': applied.get(exam['uuid']),
+            }
+            for exam in exams
+        ])
+
     @action(detail=True, methods=['post'], serializer_class=ApplyUpcomingExamSerializer)
     def apply(self, request, uuid=None):
         exam = self.get_object()
+        if admission.is_enabled():
+            # queued admission, the client follows the ticket at admission-tickets/<uuid>/
+            ticket = admission.enqueue(request.user.profile, exam)
+            return ticket_response({
+                'message': 'Application queued',
+                'data': AdmissionTicketSerializer(ticket).data
+            }, ticket, status.HTTP_202_ACCEPTED)
+
         serializer = ApplyUpcomingExamSerializer(
             data={'exam_uuid': str(exam.uuid)}, 
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        applicant_exam = serializer.save()
+        try:
+            applicant_exam = serializer.save()
+        except ExamFull:
+            ticket = admission.enqueue(request.user.profile, exam, status='waitlisted')
+            return ticket_response({
+                'message': 'This exam is full, you have been added to its waitlist',
+                'data': AdmissionTicketSerializer(ticket).data
+            }, ticket, status.HTTP_202_ACCEPTED)
         return Response({
             'message': 'Successfully applied to exam',
             'data': ApplyUpcomingExamSerializer(applicant_exam).data
         }, status=201)
 
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, uuid=None):
+        """Withdraws a not started application or a waiting ticket; a freed seat goes to the waitlist"""
+        exam = self.get_object()
+        profile = request.user.profile
+        with transaction.atomic():
+            attempts, _ = ApplicantExam.objects.filter(applicant=profile, exam=exam, status='not_started').delete()
+            tickets, _ = AdmissionTicket.objects.filter(
+                applicant=profile, exam=exam, status__in=['pending', 'waitlisted']
+            ).delete()
+        if not attempts and not tickets:
+            return Response({'detail': 'No application to cancel.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Application cancelled'})
+
     
+class AdmissionTicketView(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of queued and waitlisted applications. A ticket still waiting is
+    answered at once with a Retry-After header telling when to poll again.
+    """
+    permission_classes = [IsAuthenticated, IsApplicant]
+    serializer_class = AdmissionTicketSerializer
+    lookup_field = 'uuid'
+
+    def get_queryset(self):
+        return AdmissionTicket.objects.filter(
+            applicant=self.request.user.profile
+        ).select_related('exam', 'applicant_exam').order_by('-id')
+
+    def retrieve(self, request, *args, **kwargs):
+        ticket = self.get_object()
+        return ticket_response(self.get_serializer(ticket).data, ticket)
+
+
 class RecentExamScoresView(viewsets.ReadOnlyModelViewSet):
     serializer_class = RecentApplicantExamSerializer
     permission_classes = [IsAuthenticated, IsApplicant]
@@ -98,7 +196,7 @@ class ApplicantProfileViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return ApplicantProfile.objects.filter(user=user)
+        return ApplicantProfile.objects.filter(user_id=user.pk)
     
 
 #exam summarry
@@ -109,10 +207,19 @@ class ApplicantExamSummaryView(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         user = self.request.user
         try:
-            applicant = user.profile 
+            applicant_id = profile_id(user)
         except ApplicantProfile.DoesNotExist:
             return ApplicantExam.objects.none()
-        return ApplicantExam.objects.filter(applicant=applicant).order_by('-created_at')
+        return ApplicantExam.objects.filter(applicant_id=applicant_id).order_by('-created_at')
+
+    @action(detail=False, methods=['get'])
+    def ranks(self, request):
+        """Where each completed exam of the applicant stands among all its takers"""
+        attempts = self.get_queryset().filter(status='completed').select_related('exam')
+        return Response([
+            {'uuid': attempt.uuid, 'exam_title': attempt.exam.title, 'rank': ranking.attempt_rank(attempt)}
+            for attempt in attempts
+        ])
     
 class ApplicantExamHistoryView(viewsets.ReadOnlyModelViewSet):
     serializer_class = ApplicantExamHistorySerializer
@@ -123,14 +230,23 @@ class ApplicantExamHistoryView(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         user = self.request.user
         try:
-            applicant = user.profile
+            applicant_id = profile_id(user)
         except:
             return ApplicantExam.objects.none()
         
         return ApplicantExam.objects.filter(
-            applicant=applicant
+            applicant_id=applicant_id
         ).select_related('exam', 'recommended_course').order_by('-created_at')
 
+    @action(detail=True, methods=['get'])
+    def rank(self, request, uuid=None):
+        """Rank and percentile of this attempt among the exam's completed attempts"""
+        attempt = self.get_object()
+        rank = ranking.attempt_rank(attempt) if attempt.status == 'completed' else None
+        if rank is None:
+            return Response({'detail': 'Only completed exams are ranked.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(rank)
+
 class TakeExamViewSet(viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated, IsApplicant]
     serializer_class = TakeExamSerializer
@@ -139,12 +255,12 @@ class TakeExamViewSet(viewsets.GenericViewSet):
     def get_queryset(self):
         user = self.request.user
         try:
-            applicant = user.profile
+            applicant_id = profile_id(user)
         except:
             return ApplicantExam.objects.none()
         
         return ApplicantExam.objects.filter(
-            applicant=applicant,
+            applicant_id=applicant_id,
             status__in=['not_started', 'in_progress']
         ).select_related('exam')
     
@@ -157,10 +273,14 @@ class TakeExamViewSet(viewsets.GenericViewSet):
             if applicant_exam.status == 'not_started':
                 applicant_exam.status = 'in_progress'
                 applicant_exam.started_at = timezone.now()
-                applicant_exam.save()
+                applicant_exam.save(update_fields=['status', 'started_at'])
             
             serializer = self.get_serializer(applicant_exam)
-            return Response(serializer.data)
+            paper = get_exam_paper(applicant_exam.exam)
+            return HttpResponse(
+                render_with_paper(serializer.data, paper),
+                content_type='application/json'
+            )
         except ApplicantExam.DoesNotExist:
             return Response(
                 {'error': 'Exam not found or already completed'},
@@ -183,6 +303,18 @@ class TakeExamViewSet(viewsets.GenericViewSet):
             context={'applicant_exam': applicant_exam}
         )
         serializer.is_valid(raise_exception=True)
+        
+        if answer_journal.is_enabled():
+            # write-behind: acknowledge once journaled, counters catch up on flush
+            entry = serializer.validated_data['entry']
+            answer_journal.append(applicant_exam.pk, entry, serializer.validated_data['time_spent_seconds'])
+            return Response({
+                'message': 'Answer submitted successfully',
+                'is_correct': entry.is_correct,
+                'attempted_questions': applicant_exam.attempted_questions,
+                'total_questions': applicant_exam.total_questions,
+            }, status=status.HTTP_202_ACCEPTED)
+        
         answer = serializer.save()
         
         return Response({
@@ -192,6 +324,48 @@ class TakeExamViewSet(viewsets.GenericViewSet):
             'total_questions': applicant_exam.total_questions,
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'], serializer_class=SubmitAnswersSerializer)
+    def submit_answers(self, request, uuid=None):
+        """Submit a batch of answers in one request"""
+        applicant_exam = self.get_object()
+        
+        if applicant_exam.status != 'in_progress':
+            return Response(
+                {'error': 'Exam is not in progress'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # accept either a bare list or {"answers": [...]}
+        data = {'answers': request.data} if isinstance(request.data, list) else request.data
+        serializer = SubmitAnswersSerializer(
+            data=data,
+            context={'applicant_exam': applicant_exam}
+        )
+        serializer.is_valid(raise_exception=True)
+        
+        if answer_journal.is_enabled():
+            # write-behind like submit_answer, or a later drain could overwrite these with older answers
+            answers = serializer.validated_data['answers']
+            answer_journal.append_many(
+                applicant_exam.pk, [(item['entry'], item['time_spent_seconds']) for item in answers]
+            )
+            return Response({
+                'message': 'Answers submitted successfully',
+                'queued': len(answers),
+                'attempted_questions': applicant_exam.attempted_questions,
+                'total_questions': applicant_exam.total_questions,
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        result = serializer.save()
+        
+        return Response({
+            'message': 'Answers submitted successfully',
+            'created': result['created'],
+            'updated': result['updated'],
+            'attempted_questions': applicant_exam.attempted_questions,
+            'total_questions': applicant_exam.total_questions,
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'], serializer_class=CompleteExamSerializer)
     def complete(self, request, uuid=None):
         """Complete and submit the exam"""
@@ -203,10 +377,22 @@ class TakeExamViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer = CompleteExamSerializer(
-            context={'applicant_exam': applicant_exam}
-        )
-        completed_exam = serializer.save()
+        with transaction.atomic():
+            # under the attempt's lock: journal drains skip it, and an answer
+            # journaled after this commit finds it completed and is dropped
+            if not ApplicantExam.objects.select_for_update().filter(pk=applicant_exam.pk, status='in_progress').exists():
+                return Response(
+                    {'error': 'Exam is not in progress'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if answer_journal.is_enabled():
+                answer_journal.flush(applicant_exam.pk)
+                applicant_exam.refresh_from_db(fields=['attempted_questions', 'correct_answers'])
+            
+            serializer = CompleteExamSerializer(
+                context={'applicant_exam': applicant_exam}
+            )
+            completed_exam = serializer.save()
         
         return Response({
             'message': 'Exam completed successfully',
@@ -1,15 +1,23 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from api.models.auth import ApplicantProfile
+from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from api.models.auth import ApplicantImport, ApplicantProfile
 from api.permissions import IsAdmin, IsSuperAdmin
 from api.serializers.SuperAdminUserSerializer import (
     SuperAdminUserSerializer,
     SuperAdminUserCreateSerializer,
+    ApplicantImportSerializer,
 )
 from api.models.admission import (
     Course
 )
 from api.serializers.SuperAdminUserSerializer import CourseSerializers
+from api.pagination import KeysetPagination
+from api.utils.search import apply_search
+from api.utils import applicant_import
 
 
 class SuperAdminUserViewSet(viewsets.ModelViewSet):
@@ -23,6 +31,8 @@ class SuperAdminUserViewSet(viewsets.ModelViewSet):
 
 class SuperAdminApplicantsViewSet(viewsets.ModelViewSet):
     serializer_class = SuperAdminUserSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ['created_at', 'id']
     permission_classes = [IsSuperAdmin, IsAuthenticated]
     
     def get_queryset(self):
@@ -34,7 +44,39 @@ class SuperAdminApplicantsViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(is_verified=True)
             if is_verified_param.lower() == 'false':
                 queryset = queryset.filter(is_verified = False)
-        return queryset
+
+        # Search by name, email, contact number or school
+        return apply_search(self, queryset)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, JSONParser])
+    def import_applicants(self, request):
+        """
+        Creates applicants in bulk from an uploaded CSV or JSON 'file', or a
+        JSON body. ?dry_run=true only validates. The import runs in the
+        background: the answer is the job, its report (with the rejected rows
+        and their errors) is polled from import/<uuid>/.
+        """
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                file_type = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                rows = applicant_import.read_rows(upload.read(), file_type)
+            else:
+                rows = applicant_import.json_rows(request.data)
+        except (ValueError, UnicodeDecodeError) as error:
+            return Response({'detail': f'Could not read the applicants: {error}'}, status=400)
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        if len(rows) > applicant_import.MAX_ROWS:
+            return Response({'detail': f'At most {applicant_import.MAX_ROWS} applicants per import.'}, status=400)
+
+        job = applicant_import.submit(rows, dry_run=dry_run, user=request.user)
+        return Response(ApplicantImportSerializer(job).data, status=202)
+
+    @action(detail=False, methods=['get'], url_path=r'import/(?P<job_uuid>[0-9a-f-]+)')
+    def import_status(self, request, job_uuid=None):
+        """An import job, with its report once it is done"""
+        job = get_object_or_404(ApplicantImport, uuid=job_uuid)
+        return Response(ApplicantImportSerializer(job).data)
     
 class SuperAdminManageCourses(viewsets.ModelViewSet):
     queryset = Course.objects.all()
@@ -0,0 +1,177 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from api.models.admission import Course
+from api.models.auth import ApplicantProfile
+from api.models.exam import Exam, Question, Choice, ApplicantExam
+from api.utils.course_index import bump_course_index
+from api.utils.recommendations import schedule_rerecommendation
+from api.utils.admission import schedule_promotion
+from api.utils.search import index_profiles
+from api.utils import statistics
+from api.utils.token_revocation import revoke_tokens
+
+
+#exam content versioning
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, created=False, **kwargs):
+    # question version first: an answer key built for the new content version must see it
+    if kwargs['signal'] is post_save and not created:
+        Question.bump_version(instance.pk)
+    Exam.bump_content_version(instance.exam_id)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    exam_id = Question.objects.filter(pk=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id:
+        Question.bump_version(instance.question_id)
+        Exam.bump_content_version(exam_id)
+
+
+#exam seats
+@receiver(post_delete, sender=ApplicantExam)
+def attempt_deleted(sender, instance, **kwargs):
+    Exam.release_seat(instance.exam_id)
+    schedule_promotion(instance.exam_id)
+
+
+@receiver(pre_save, sender=Exam)
+def remember_max_applicants(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_max_applicants = Exam.objects.filter(pk=instance.pk).values_list('max_applicants', flat=True).first()
+
+
+@receiver(post_save, sender=Exam)
+def exam_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_max_applicants', None)
+    if not created and previous is not None and instance.max_applicants > previous:
+        schedule_promotion(instance.pk)
+
+
+#course thresholds
+@receiver(pre_save, sender=Course)
+def remember_min_score(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_min_score = Course.objects.filter(pk=instance.pk).values_list('min_score', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, created, **kwargs):
+    bump_course_index(instance.pk)
+    if created or instance.min_score != getattr(instance, '_previous_min_score', None):
+        schedule_rerecommendation()
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    bump_course_index()
+    schedule_rerecommendation()
+
+
+#applicant search index
+@receiver(post_save, sender=ApplicantProfile)
+def profile_saved(sender, instance, **kwargs):
+    index_profiles([instance])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        index_profiles(ApplicantProfile.objects.select_related('user').filter(user=instance))
+
+
+#materialized result statistics
+STATISTICS_FIELDS = {'status', 'recommendation_score', 'recommended_course', 'exam'}
+APPLIED_COURSE_FIELDS = {'user_type', 'course_applied'}
+
+
+@receiver(pre_save, sender=ApplicantExam)
+def load_contribution(sender, instance, update_fields=None, **kwargs):
+    # only creations and saves naming a statistics field are tracked, writers of
+    # those fields pass update_fields (a full save of an existing attempt is not)
+    instance._stats_track = instance._state.adding or (
+        update_fields is not None and bool(STATISTICS_FIELDS & set(update_fields))
+    )
+    if instance._stats_track:
+        instance._stats_contribution = None if instance._state.adding else statistics.stored_contribution(instance.pk)
+
+
+@receiver(post_save, sender=ApplicantExam)
+def attempt_saved(sender, instance, **kwargs):
+    if instance._stats_track:
+        new = statistics.contribution(instance)
+        if new is statistics.UNKNOWN:
+            new = statistics.stored_contribution(instance.pk)
+        statistics.record(instance._stats_contribution, new)
+
+
+@receiver(pre_delete, sender=ApplicantExam)
+def load_deleted_contribution(sender, instance, **kwargs):
+    instance._stats_contribution = statistics.stored_contribution(instance.pk)
+
+
+@receiver(post_delete, sender=ApplicantExam)
+def attempt_removed(sender, instance, **kwargs):
+    statistics.record(instance._stats_contribution, None)
+
+
+@receiver(pre_save, sender=ApplicantProfile)
+def load_stored_profile(sender, instance, update_fields=None, **kwargs):
+    # one read for the applied course and the role change check (token revocation below)
+    instance._stats_track = update_fields is None or bool(APPLIED_COURSE_FIELDS & set(update_fields))
+    instance._stats_course = instance._previous_user_type = None
+    if instance._stats_track and not instance._state.adding:
+        stored = ApplicantProfile.objects.filter(pk=instance.pk).values('user_type', 'course_applied_id').first()
+        if stored:
+            instance._previous_user_type = stored['user_type']
+            instance._stats_course = statistics.applied_course(ApplicantProfile(**stored))
+
+
+@receiver(post_save, sender=ApplicantProfile)
+def applied_course_saved(sender, instance, **kwargs):
+    if instance._stats_track:
+        new = statistics.applied_course(instance)
+        if new is statistics.UNKNOWN:
+            new = statistics.stored_applied_course(instance.pk)
+        statistics.record_applicant(instance._stats_course, new)
+
+
+@receiver(pre_delete, sender=ApplicantProfile)
+def load_deleted_applied_course(sender, instance, **kwargs):
+    instance._stats_course = statistics.stored_applied_course(instance.pk)
+
+
+@receiver(post_delete, sender=ApplicantProfile)
+def applicant_removed(sender, instance, **kwargs):
+    statistics.record_applicant(instance._stats_course, None)
+
+
+#token revocation, claim-authenticated requests never read the user row
+@receiver(pre_save, sender=User)
+def remember_is_active(sender, instance, **kwargs):
+    if instance.pk:
+        instance._was_active = User.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_deactivated(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_was_active', False) and not instance.is_active:
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
+
+
+@receiver(post_save, sender=ApplicantProfile)
+def user_type_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_user_type', None)
+    if not created and previous is not None and previous != instance.user_type:
+        revoke_tokens(instance.user_id)
+
+
+@receiver(post_delete, sender=ApplicantProfile)
+def profile_deleted(sender, instance, **kwargs):
+    revoke_tokens(instance.user_id)
@@ -1,3 +1,966 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import tempfile
+from decimal import Decimal
+import threading
+from unittest import mock
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api.models.admission import Course
+from api.models.auth import ApplicantImport, ApplicantProfile
+from api.models.exam import Exam, Question, Choice, ApplicantExam, ApplicantAnswer, AdmissionTicket, ItemStatistic, ResultStatistic
+from api.serializers.ApplicantsSerializer import SubmitAnswerSerializer
+from api.serializers.TokenSerializers import ClaimsTokenObtainPairSerializer
+from api.utils import (
+    admission, answer_journal, answer_key, applicant_import, course_index, distribution, exam_paper, grading,
+    login_pool, ranking, statistics, token_revocation,
+)
 
-# Create your tests here.
+
+def make_applicant(username, user_type='applicant'):
+    user = User.objects.create_user(username, f'{username}@example.com')
+    return ApplicantProfile.objects.create(user=user, user_type=user_type)
+
+
+def client_for(profile):
+    client = APIClient()
+    client.force_authenticate(profile.user)
+    return client
+
+
+def make_exam(questions=1, **kwargs):
+    exam = Exam.objects.create(
+        title='Entrance Exam',
+        date=timezone.now().date() + datetime.timedelta(days=1),
+        duration_minutes=60,
+        access_code='ABC123',
+        **kwargs
+    )
+    for number in range(questions):
+        question = Question.objects.create(exam=exam, text=f'Question {number + 1}')
+        Choice.objects.create(question=question, label='A', text='Right', is_correct=True)
+        Choice.objects.create(question=question, label='B', text='Wrong')
+    return exam
+
+
+def run_concurrently(target, count):
+    """Runs target(index) in `count` threads released at the same time; returns the exceptions raised"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(index):
+        try:
+            barrier.wait()
+            target(index)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def clear_caches():
+    """Rolled back tests hand out the same ids again, so versioned cache keys would collide"""
+    cache.clear()
+    lrus = (answer_key._keys, exam_paper._papers, distribution._distributions, course_index._indexes,
+            ranking._indexes, token_revocation._checked)
+    for lru in lrus:
+        lru.clear()
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class SubmitAnswerConcurrencyTests(TransactionTestCase):
+    """Double-clicked submissions of the same answer, as they hit MySQL"""
+
+    def setUp(self):
+        self.exam = make_exam()
+        self.question = self.exam.questions.get()
+        self.attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('applicant'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=1,
+        )
+
+    def submit(self, label):
+        choice = self.question.choices.get(label=label)
+        serializer = SubmitAnswerSerializer(
+            data={'question_uuid': self.question.uuid, 'choice_uuid': choice.uuid},
+            context={'applicant_exam': ApplicantExam.objects.get(pk=self.attempt.pk)},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_concurrent_first_submissions(self):
+        errors = run_concurrently(lambda index: self.submit('A'), 8)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(ApplicantAnswer.objects.filter(applicant_exam=self.attempt).count(), 1)
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.attempted_questions, self.attempt.correct_answers), (1, 1))
+
+    def test_concurrent_changed_answers(self):
+        errors = run_concurrently(lambda index: self.submit('AB'[index % 2]), 8)
+
+        self.assertEqual(errors, [])
+        answer = ApplicantAnswer.objects.get(applicant_exam=self.attempt)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.attempted_questions, 1)
+        self.assertEqual(self.attempt.correct_answers, int(answer.is_correct))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class AdmissionLoadTests(TransactionTestCase):
+    """A registration burst of more applicants than seats must never oversell the exam"""
+    APPLICANTS = 40
+    SEATS = 7
+
+    def setUp(self):
+        self.exam = make_exam(max_applicants=self.SEATS)
+        self.users = [make_applicant(f'applicant{number}').user for number in range(self.APPLICANTS)]
+
+    def apply(self, index):
+        client = APIClient()
+        client.force_authenticate(self.users[index])
+        response = client.post(f'/api/upcoming-exams/{self.exam.uuid}/apply/')
+        self.assertIn(response.status_code, (201, 202), response.content)
+
+    def assertNotOversold(self):
+        self.exam.refresh_from_db()
+        attempts = ApplicantExam.objects.filter(exam=self.exam).count()
+        self.assertEqual(attempts, self.SEATS)
+        self.assertEqual(self.exam.seats_taken, self.SEATS)
+        self.assertEqual(
+            AdmissionTicket.objects.filter(exam=self.exam, status='waitlisted').count(),
+            self.APPLICANTS - self.SEATS,
+        )
+
+    def test_direct_apply_burst(self):
+        # the waitlisted find no seat, their worker has nothing to do
+        with mock.patch.object(admission, 'schedule_admission'):
+            errors = run_concurrently(self.apply, self.APPLICANTS)
+
+        self.assertEqual(errors, [])
+        self.assertNotOversold()
+
+    @override_settings(EXAM_ADMISSION_QUEUE=True)
+    def test_queued_apply_burst(self):
+        # the queue is drained below by competing workers, as if from several processes
+        with mock.patch.object(admission, 'schedule_admission'):
+            errors = run_concurrently(self.apply, self.APPLICANTS)
+        self.assertEqual(errors, [])
+        self.assertEqual(AdmissionTicket.objects.filter(exam=self.exam, status='pending').count(), self.APPLICANTS)
+
+        errors = run_concurrently(lambda index: admission.process_queue(self.exam.pk, batch_size=5), 4)
+
+        self.assertEqual(errors, [])
+        self.assertNotOversold()
+        self.assertEqual(
+            AdmissionTicket.objects.filter(exam=self.exam, status='admitted', applicant_exam__isnull=False).count(),
+            self.SEATS,
+        )
+
+    @override_settings(EXAM_ADMISSION_QUEUE=True)
+    def test_waiting_ticket_is_answered_with_retry_after(self):
+        with mock.patch.object(admission, 'schedule_admission'):
+            self.apply(0)
+        ticket = AdmissionTicket.objects.get(exam=self.exam)
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+
+        response = client.get(f'/api/admission-tickets/{ticket.uuid}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Retry-After'], str(admission.PENDING_RETRY_SECONDS))
+
+
+class TokenRevocationTests(TestCase):
+    """Claim-authenticated requests never read the user, the revocation list stands in for it"""
+
+    def setUp(self):
+        clear_caches()
+        token_revocation._checked.clear()
+        self.user = make_applicant('applicant').user
+
+    def client_with(self, issued_seconds_ago=0):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        token['iat'] -= issued_seconds_ago
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def test_deactivating_a_user_revokes_its_tokens(self):
+        client = self.client_with(issued_seconds_ago=10)
+        self.assertEqual(client.get('/api/exam-history/').status_code, 200)
+
+        # as on MySQL, which has no ON CONFLICT target
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.user.is_active = False
+            self.user.save()
+            self.user.is_active = True
+            self.user.save()
+
+        token_revocation._checked.clear()
+        self.assertEqual(client.get('/api/exam-history/').status_code, 401)
+
+    def test_login_in_the_second_of_the_revocation_is_accepted(self):
+        token_revocation.revoke_tokens(self.user.pk)
+
+        self.assertEqual(self.client_with().get('/api/exam-history/').status_code, 200)
+
+
+class ItemAnalysisTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=2)
+        self.first, self.second = self.exam.questions.order_by('id')
+        for number, labels in enumerate(['AA', 'AB', 'BB']):
+            attempt = ApplicantExam.objects.create(
+                applicant=make_applicant(f'applicant{number}'), exam=self.exam,
+                status='completed', completed_at=timezone.now(), total_questions=2,
+            )
+            for question, label in zip((self.first, self.second), labels):
+                ApplicantAnswer.objects.create(
+                    applicant_exam=attempt, question=question, selected_choice=question.choices.get(label=label)
+                )
+        self.client = client_for(make_applicant('admin', user_type='admin'))
+
+    def analyze(self):
+        # as on MySQL, which has no ON CONFLICT target
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            response = self.client.post(f'/api/exams/{self.exam.uuid}/item-analysis/')
+        self.assertEqual(response.status_code, 200)
+        return {item['question_uuid']: item for item in response.json()}
+
+    def test_analysis_is_stored_per_question_version(self):
+        self.analyze()
+        items = self.analyze()
+
+        self.assertEqual(ItemStatistic.objects.count(), 2)
+        self.assertEqual(items[str(self.first.uuid)]['responses'], 3)
+        self.assertEqual(items[str(self.first.uuid)]['difficulty'], '0.6667')
+        self.assertEqual(items[str(self.second.uuid)]['difficulty'], '0.3333')
+
+    def test_answers_to_an_earlier_version_are_left_out(self):
+        self.analyze()
+        self.first.text = 'Question 1, reworded'
+        self.first.save()
+        attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('late'), exam=Exam.objects.get(pk=self.exam.pk),
+            status='completed', completed_at=timezone.now(), total_questions=2,
+        )
+        ApplicantAnswer.objects.create(
+            applicant_exam=attempt, question=self.first, selected_choice=self.first.choices.get(label='B')
+        )
+
+        items = self.analyze()
+
+        self.assertEqual(ItemStatistic.objects.count(), 3)
+        self.assertEqual(items[str(self.first.uuid)]['responses'], 1)
+        self.assertEqual(items[str(self.first.uuid)]['difficulty'], '0.0000')
+        self.assertEqual(items[str(self.second.uuid)]['responses'], 4)
+
+
+class ResultStatisticsTests(TestCase):
+    """The cells follow completions and regrades without costing other ORM uses"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=2)
+        self.attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('applicant'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=2,
+        )
+
+    def answer(self, question, label):
+        ApplicantAnswer.objects.create(
+            applicant_exam=self.attempt, question=question, selected_choice=question.choices.get(label=label)
+        )
+
+    def test_completion_is_counted_in_its_cell(self):
+        for question in self.exam.questions.all():
+            self.answer(question, 'A')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.grade_attempt(self.attempt)
+
+        cell = ResultStatistic.objects.get(exam=self.exam)
+        self.assertEqual((cell.attempts, cell.score_sum, cell.max_score), (1, Decimal('100.00'), Decimal('100.00')))
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.results_version, 2)
+
+    def test_regrade_moves_the_attempt_between_scores(self):
+        first = self.exam.questions.first()
+        self.answer(first, 'A')
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.grade_attempt(self.attempt)
+        first.choices.filter(label='A').update(is_correct=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.regrade_exam(self.exam)
+
+        cell = ResultStatistic.objects.get(exam=self.exam)
+        self.assertEqual((cell.attempts, cell.score_sum), (1, Decimal('0.00')))
+
+    def test_saves_without_statistics_fields_read_nothing(self):
+        attempt = ApplicantExam.objects.get(pk=self.attempt.pk)
+
+        with self.assertNumQueries(1):
+            attempt.save()
+        with self.assertNumQueries(1):
+            attempt.save(update_fields=['attempted_questions'])
+
+    def test_bulk_tracking_of_deferred_attempts_fails_loudly(self):
+        attempts = list(ApplicantExam.objects.only('id'))
+
+        with self.assertRaises(ValueError):
+            statistics.track(attempts, statistics.snapshot(attempts))
+
+
+class AdmissionRecoveryTests(TestCase):
+    """Tickets a stopped worker left behind are settled by process_admission_queue"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(max_applicants=1)
+        self.holder = make_applicant('holder')
+        self.waiting = make_applicant('waiting')
+
+    def test_new_waitlisted_ticket_wakes_the_worker(self):
+        with mock.patch.object(admission, 'schedule_admission') as schedule:
+            admission.enqueue(self.waiting, self.exam, status='waitlisted')
+
+        schedule.assert_called_once_with(self.exam.pk)
+
+    def test_command_promotes_the_waitlist_into_a_freed_seat(self):
+        Exam.reserve_seat(self.exam.pk)
+        attempt = ApplicantExam.objects.create(applicant=self.holder, exam=self.exam, status='not_started')
+        with mock.patch.object(admission, 'schedule_admission'):
+            ticket = admission.enqueue(self.waiting, self.exam, status='waitlisted')
+            # the worker woken by the freed seat never runs
+            attempt.delete()
+
+        call_command('process_admission_queue', stdout=io.StringIO())
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'admitted')
+        self.assertEqual(ticket.applicant_exam.applicant, self.waiting)
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.seats_taken, 1)
+
+
+class AnswerJournalTests(TestCase):
+    """Write-behind answers (ANSWER_WRITE_BEHIND) end up on the attempt, never on a graded one"""
+
+    def setUp(self):
+        clear_caches()
+        journal = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+        journal.close()
+        self.addCleanup(os.remove, journal.name)
+        settings = override_settings(ANSWER_WRITE_BEHIND=True, ANSWER_JOURNAL_PATH=journal.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        answer_journal._local.conn = None
+        self.addCleanup(setattr, answer_journal._local, 'conn', None)
+        # drained explicitly below
+        flusher = mock.patch.object(answer_journal, 'start_flusher')
+        flusher.start()
+        self.addCleanup(flusher.stop)
+
+        self.exam = make_exam(questions=2)
+        self.first, self.second = self.exam.questions.order_by('id')
+        self.attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('applicant'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=2,
+        )
+        self.client = client_for(self.attempt.applicant)
+
+    def choice(self, question, label):
+        return {'question_uuid': str(question.uuid), 'choice_uuid': str(question.choices.get(label=label).uuid)}
+
+    def post(self, action, data=None):
+        return self.client.post(f'/api/take-exam/{self.attempt.uuid}/{action}/', data, format='json')
+
+    def journaled(self):
+        return answer_journal._connection().execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+
+    def test_bulk_answers_are_journaled_in_order_with_single_ones(self):
+        response = self.post('submit_answers', [self.choice(self.first, 'B'), self.choice(self.second, 'A')])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['queued'], 2)
+        self.assertFalse(ApplicantAnswer.objects.exists())
+        self.post('submit_answer', self.choice(self.first, 'A'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('complete')
+
+        self.assertEqual(response.json()['correct_answers'], 2)
+        self.assertEqual(self.journaled(), 0)
+
+    def test_answer_journaled_after_completion_is_dropped(self):
+        self.post('submit_answer', self.choice(self.first, 'A'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post('complete')
+        # a submission that passed its status check just before the completion
+        entry = answer_key.get_answer_key(Exam.objects.get(pk=self.exam.pk)).lookup(
+            self.second.uuid, self.second.choices.get(label='A').uuid
+        )
+        answer_journal.append(self.attempt.pk, entry, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            answer_journal.flush()
+
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.attempted_questions, self.attempt.correct_answers), (1, 1))
+        self.assertFalse(ApplicantAnswer.objects.filter(question=self.second).exists())
+        self.assertEqual(self.journaled(), 0)
+
+
+class ExamAuthoringRegradeTests(TestCase):
+    """Questions added to an exam with results count against every attempt"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=1)
+        question = self.exam.questions.get()
+        self.attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('applicant'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=1,
+        )
+        ApplicantAnswer.objects.create(
+            applicant_exam=self.attempt, question=question, selected_choice=question.choices.get(label='A')
+        )
+        grading.grade_attempt(self.attempt)
+        self.client = client_for(make_applicant('admin', user_type='admin'))
+
+    def assertGraded(self, total_questions, score):
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.total_questions, self.attempt.correct_answers), (total_questions, 1))
+        self.assertEqual(self.attempt.recommendation_score, Decimal(score))
+
+    def test_created_question_regrades(self):
+        response = self.client.post(f'/api/exams/{self.exam.uuid}/questions/', {'text': 'Question 2'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['regrade']['attempts_changed'], 1)
+        self.assertGraded(2, '50.00')
+
+    def test_imported_questions_regrade(self):
+        questions = [
+            {'text': f'Imported {number}', 'choices': [{'text': 'Right', 'is_correct': True}, {'text': 'Wrong'}]}
+            for number in range(3)
+        ]
+        response = self.client.post(f'/api/exams/{self.exam.uuid}/import/', {'questions': questions}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_questions'], 4)
+        self.assertGraded(4, '25.00')
+
+
+class ApplicantImportTests(TestCase):
+    """Imports run as jobs; every rejected row is reported instead of failing the import"""
+
+    def setUp(self):
+        clear_caches()
+        make_applicant('taken')
+        self.superadmin = make_applicant('superadmin', user_type='superadmin')
+        self.client = client_for(self.superadmin)
+        # run the job inline, a test transaction is invisible to the import thread
+        runner = mock.patch.object(applicant_import, '_enqueue', applicant_import.run_job)
+        runner.start()
+        self.addCleanup(runner.stop)
+
+    def row(self, username, **fields):
+        return {
+            'username': username, 'email': f'{username}@example.com', 'first_name': 'First',
+            'last_name': 'Last', 'password': 'a-long-password', **fields,
+        }
+
+    def import_rows(self, rows, query=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/superadmin/applicants/import/{query}', rows, format='json')
+        self.assertEqual(response.status_code, 202)
+        response = self.client.get(f"/api/superadmin/applicants/import/{response.json()['uuid']}/")
+        self.assertEqual(response.json()['status'], 'done')
+        return response.json()['report']
+
+    def test_dry_run_reports_every_rejected_row(self):
+        report = self.import_rows([
+            self.row('fresh'),
+            self.row('taken'),
+            self.row('x' * 151),
+            self.row('has space', email='space@example.com'),
+            self.row('school', high_school='x' * 101),
+            self.row('fresh', email='other@example.com'),
+        ], '?dry_run=true')
+
+        self.assertEqual((report['total'], report['imported'], report['dry_run']), (6, 1, True))
+        self.assertEqual(
+            {error['row']: sorted(error['errors']) for error in report['errors']},
+            {2: ['email', 'username'], 3: ['username'], 4: ['username'], 5: ['high_school'], 6: ['username']},
+        )
+        self.assertFalse(User.objects.filter(username='fresh').exists())
+
+    def test_import_creates_the_valid_rows(self):
+        report = self.import_rows({'applicants': [self.row('first'), self.row('second'), self.row('taken')]})
+
+        self.assertEqual((report['imported'], len(report['errors'])), (2, 1))
+        profile = ApplicantProfile.objects.get(user__username='second')
+        self.assertEqual(profile.user_type, 'applicant')
+        self.assertTrue(profile.user.check_password('a-long-password'))
+        self.assertEqual(ApplicantImport.objects.get().created_by, self.superadmin.user)
+
+
+class ExamPaperTests(TestCase):
+    """The take-exam paper is compiled once per content version and never shows the answers"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=2)
+        self.attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('applicant'), exam=self.exam, total_questions=2,
+        )
+        self.client = client_for(self.attempt.applicant)
+
+    def paper(self):
+        response = self.client.get(f'/api/take-exam/{self.attempt.uuid}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['questions']
+
+    def test_paper_is_cached_without_answers(self):
+        questions = self.paper()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.paper(), questions)
+
+        self.assertEqual([question['text'] for question in questions], ['Question 1', 'Question 2'])
+        self.assertEqual(set(questions[0]['choices'][0]), {'uuid', 'label', 'text'})
+        self.assertFalse([query for query in queries.captured_queries if 'api_question' in query['sql']])
+
+    def test_question_edit_invalidates_the_paper(self):
+        self.paper()
+        question = self.exam.questions.order_by('id').first()
+        question.text = 'Question 1, reworded'
+        question.save()
+
+        self.assertEqual(self.paper()[0]['text'], 'Question 1, reworded')
+
+
+class AnswerKeyTests(TestCase):
+    """Answers are graded from the cached answer key, which follows edits of the correct choice"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=2)
+        self.first, self.second = self.exam.questions.order_by('id')
+        self.attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('applicant'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=2,
+        )
+        self.client = client_for(self.attempt.applicant)
+
+    def submit(self, question, choice):
+        return self.client.post(f'/api/take-exam/{self.attempt.uuid}/submit_answer/', {
+            'question_uuid': str(question.uuid), 'choice_uuid': str(choice.uuid),
+        }, format='json')
+
+    def test_choice_of_another_question_is_refused(self):
+        response = self.submit(self.first, self.second.choices.get(label='A'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ApplicantAnswer.objects.exists())
+
+    def test_answers_are_graded_without_reading_choices(self):
+        self.submit(self.first, self.first.choices.get(label='A'))
+        wrong = self.second.choices.get(label='B')
+        with CaptureQueriesContext(connection) as queries:
+            self.submit(self.second, wrong)
+
+        graded = dict(ApplicantAnswer.objects.values_list('question_id', 'is_correct'))
+        self.assertEqual(graded, {self.first.pk: True, self.second.pk: False})
+        self.assertFalse([query for query in queries.captured_queries if 'FROM "api_choice"' in query['sql']])
+
+    def test_key_follows_a_changed_correct_choice(self):
+        self.submit(self.first, self.first.choices.get(label='B'))
+        admin = client_for(make_applicant('admin', user_type='admin'))
+        for label, is_correct in (('A', False), ('B', True)):
+            response = admin.patch(
+                f'/api/choices/{self.first.choices.get(label=label).uuid}/', {'is_correct': is_correct}, format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.submit(self.first, self.first.choices.get(label='B'))
+
+        self.assertTrue(ApplicantAnswer.objects.get(question=self.first).is_correct)
+
+
+class GradingTests(TestCase):
+    """Completion totals come from one aggregate, whatever the number of answers"""
+
+    def setUp(self):
+        clear_caches()
+        self.science = Course.objects.create(code='BSCS', name='Computer Science', min_score=Decimal('60'))
+        Course.objects.create(code='BSN', name='Nursing', min_score=Decimal('90'))
+        self.exam = make_exam(questions=6)
+
+    def attempt(self, username, labels):
+        attempt = ApplicantExam.objects.create(
+            applicant=make_applicant(username), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=6,
+        )
+        for question, label in zip(self.exam.questions.order_by('id'), labels):
+            ApplicantAnswer.objects.create(
+                applicant_exam=attempt, question=question, selected_choice=question.choices.get(label=label)
+            )
+        return attempt
+
+    def test_complete_grades_the_attempt(self):
+        attempt = self.attempt('applicant', 'AAAAB')
+
+        response = client_for(attempt.applicant).post(f'/api/take-exam/{attempt.uuid}/complete/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.json()['score'], response.json()['correct_answers'], response.json()['recommended_course']),
+            (66.67, 4, 'Computer Science'),
+        )
+        attempt.refresh_from_db()
+        self.assertEqual(
+            (attempt.status, attempt.attempted_questions, attempt.recommended_course), ('completed', 5, self.science)
+        )
+        self.assertEqual(ApplicantProfile.objects.get(pk=attempt.applicant_id).exam_score, Decimal('66.67'))
+
+    def test_grading_queries_do_not_grow_with_the_answers(self):
+        # same score, so both land in the statistics cell the first one creates
+        grading.grade_attempt(self.attempt('warm', 'A'))
+        small, large = self.attempt('small', 'AB'), self.attempt('large', 'ABBBBB')
+
+        with CaptureQueriesContext(connection) as small_queries:
+            grading.grade_attempt(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            grading.grade_attempt(large)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual((small.attempted_questions, large.attempted_questions), (2, 6))
+        self.assertEqual(large.recommendation_score, Decimal('16.67'))
+
+    def test_batch_grading_matches_single_grading(self):
+        attempts = [self.attempt('first', 'AB'), self.attempt('second', 'AAAABB')]
+
+        self.assertEqual(grading.grade_exam(self.exam), 2)
+
+        self.assertEqual(
+            list(ApplicantExam.objects.filter(pk__in=[attempt.pk for attempt in attempts]).order_by('pk')
+                 .values_list('status', 'correct_answers', 'recommendation_score')),
+            [('completed', 1, Decimal('16.67')), ('completed', 4, Decimal('66.67'))],
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    """Pages follow (created_at, id), so rows sharing a timestamp are neither skipped nor repeated"""
+
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_applicant('superadmin', user_type='superadmin'))
+        tie = timezone.now()
+        for number in range(5):
+            profile = make_applicant(f'applicant{number}')
+            if number < 4:
+                ApplicantProfile.objects.filter(pk=profile.pk).update(created_at=tie)
+
+    def test_cursor_round_trip(self):
+        url, pages, usernames = '/api/superadmin/applicants/?page_size=2&count=true', 0, []
+        while url:
+            body = self.client.get(url).json()
+            self.assertEqual(body['count'], 5)
+            usernames += [row['username'] for row in body['results']]
+            url, pages = body['next'], pages + 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(usernames, [f'applicant{number}' for number in range(5)])
+
+    def test_lists_stay_unpaginated_by_default(self):
+        self.assertEqual(len(self.client.get('/api/superadmin/applicants/').json()), 5)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/superadmin/applicants/?cursor=bm90LWEtbGlzdA==').status_code, 404)
+
+
+class ApplicantSearchTests(TestCase):
+    """?search= matches word prefixes of names, emails, numbers and schools, whole words first"""
+
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_applicant('superadmin', user_type='superadmin'))
+        for username, first_name, last_name, contact_number in (
+            ('maria', 'María', 'Peña', '0917-123 4567'),
+            ('mario', 'Mario', 'Santos', ''),
+            ('marianne', 'Marianne', 'Cruz', ''),
+        ):
+            profile = make_applicant(username)
+            profile.user.first_name, profile.user.last_name = first_name, last_name
+            profile.user.save()
+            profile.contact_number = contact_number
+            profile.save()
+
+    def search(self, query):
+        response = self.client.get('/api/superadmin/applicants/', {'search': query})
+        return [row['username'] for row in response.json()]
+
+    def test_prefixes_without_accents(self):
+        self.assertEqual(sorted(self.search('mari')), ['maria', 'marianne', 'mario'])
+        self.assertEqual(self.search('pena mar'), ['maria'])
+        self.assertEqual(self.search('09171234567'), ['maria'])
+
+    def test_whole_words_rank_first(self):
+        self.assertEqual(self.search('maria')[0], 'maria')
+
+    def test_renamed_user_is_reindexed(self):
+        user = User.objects.get(username='mario')
+        user.last_name = 'Reyes'
+        user.save()
+
+        self.assertEqual(self.search('santos'), [])
+        self.assertEqual(self.search('reyes'), ['mario'])
+
+
+class ScoreDistributionTests(TestCase):
+    """The distribution is cached per results version, so a new result shows up at once"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=5)
+        for number, score in enumerate(('20', '40', '40', '100')):
+            ApplicantExam.objects.create(
+                applicant=make_applicant(f'applicant{number}'), exam=self.exam, status='completed',
+                completed_at=timezone.now(), total_questions=5, recommendation_score=Decimal(score),
+            )
+        self.client = client_for(make_applicant('admin', user_type='admin'))
+
+    def distribution(self, query=''):
+        response = self.client.get(f'/api/admin/results/distribution/?exam={self.exam.uuid}&bins=5{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_summary_histogram_and_ranks(self):
+        result = self.distribution('&ranks=true')
+
+        self.assertEqual((result['count'], result['mean'], result['quantiles']['p50']), (4, 50.0, 40.0))
+        self.assertEqual([bucket['count'] for bucket in result['histogram']], [0, 1, 2, 0, 1])
+        self.assertEqual(
+            sorted((rank['score'], rank['percentile_rank']) for rank in result['ranks']),
+            [(20.0, 12.5), (40.0, 50.0), (40.0, 50.0), (100.0, 87.5)],
+        )
+
+    def test_new_result_is_not_served_from_cache(self):
+        self.distribution()
+        attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('late'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=5,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.grade_attempt(attempt)
+
+        result = self.distribution()
+        self.assertEqual((result['count'], result['min']), (5, 0.0))
+
+
+class RankingTests(TestCase):
+    """Higher score first, then the earlier completion; ranks follow new results"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=5)
+        self.course = Course.objects.create(code='BSCS', name='Computer Science', min_score=Decimal('60'))
+        start = timezone.now() - datetime.timedelta(hours=1)
+        self.attempts = [
+            ApplicantExam.objects.create(
+                applicant=make_applicant(username), exam=self.exam, status='completed', total_questions=5,
+                completed_at=start + datetime.timedelta(minutes=minutes), recommendation_score=Decimal(score),
+                recommended_course=self.course if Decimal(score) >= 60 else None,
+            )
+            for username, score, minutes in (('late', '80', 20), ('early', '80', 10), ('low', '40', 0))
+        ]
+
+    def rank(self, attempt):
+        return client_for(attempt.applicant).get(f'/api/exam-history/{attempt.uuid}/rank/')
+
+    def test_ties_go_to_the_earlier_completion(self):
+        late, early, low = (self.rank(attempt).json() for attempt in self.attempts)
+
+        self.assertEqual((early['rank'], late['rank'], low['rank']), (1, 2, 3))
+        self.assertEqual((late['percentile'], late['course_rank'], late['course_total']), (33.33, 2, 2))
+        self.assertIsNone(low['course_rank'])
+
+    def test_leaderboard(self):
+        response = client_for(make_applicant('admin', user_type='admin')).get(
+            '/api/admin/results/leaderboard/', {'exam': str(self.exam.uuid), 'limit': 2}
+        )
+
+        self.assertEqual([row['rank'] for row in response.json()], [1, 2])
+        self.assertEqual(
+            [row['uuid'] for row in response.json()], [str(self.attempts[1].uuid), str(self.attempts[0].uuid)]
+        )
+
+    def test_new_result_moves_the_ranks(self):
+        self.rank(self.attempts[0])
+        attempt = ApplicantExam.objects.create(
+            applicant=make_applicant('best'), exam=self.exam,
+            status='in_progress', started_at=timezone.now(), total_questions=5,
+        )
+        self.assertEqual(self.rank(attempt).status_code, 400)
+        for question in self.exam.questions.all():
+            ApplicantAnswer.objects.create(
+                applicant_exam=attempt, question=question, selected_choice=question.choices.get(label='A')
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.grade_attempt(attempt)
+
+        self.assertEqual(self.rank(attempt).json()['rank'], 1)
+        self.assertEqual(self.rank(self.attempts[0]).json()['rank'], 3)
+
+
+class LoginTests(TestCase):
+    """token/ checks passwords through the login pool with ModelBackend's outcome"""
+
+    def setUp(self):
+        clear_caches()
+        self.profile = make_applicant('applicant')
+        self.profile.user.set_password('a-long-password')
+        self.profile.user.save()
+
+    def login(self, username='applicant', password='a-long-password'):
+        return APIClient().post('/api/token/', {'username': username, 'password': password}, format='json')
+
+    def test_login_issues_tokens_with_claims(self):
+        response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        token = AccessToken(response.json()['access'])
+        self.assertEqual((token['profile_id'], token['user_type']), (self.profile.pk, 'applicant'))
+        self.assertEqual(login_pool.stats()['queue_depth'], 0)
+        self.assertEqual(login_pool._user_locks, {})
+
+    def test_wrong_password_and_unknown_user_are_refused(self):
+        self.assertEqual(self.login(password='wrong').status_code, 401)
+        self.assertEqual(self.login(username='nobody').status_code, 401)
+
+    def test_outdated_hash_is_upgraded(self):
+        hasher = PBKDF2PasswordHasher()
+        self.profile.user.password = hasher.encode('a-long-password', hasher.salt(), iterations=1000)
+        self.profile.user.save()
+
+        self.assertEqual(self.login().status_code, 200)
+
+        self.profile.user.refresh_from_db()
+        self.assertEqual(hasher.decode(self.profile.user.password)['iterations'], hasher.iterations)
+
+    def test_full_queue_answers_429(self):
+        with mock.patch.object(login_pool, 'QUEUE_LIMIT', 0):
+            self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login().status_code, 200)
+
+
+class QuestionImportTests(TestCase):
+    """Question banks are imported whole or not at all, and the cached paper follows"""
+
+    def setUp(self):
+        clear_caches()
+        self.exam = make_exam(questions=1)
+        self.client = client_for(make_applicant('admin', user_type='admin'))
+
+    def upload(self, name, content):
+        return self.client.post(
+            f'/api/exams/{self.exam.uuid}/import/', {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart',
+        )
+
+    def test_csv_import(self):
+        response = self.upload('bank.csv', 'question,A,B,C,answer\nTwo plus two?,3,4,5,B\nPrimes?,2,4,7,"A,C"\n')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'imported': 2, 'total_questions': 3})
+        primes = self.exam.questions.get(text='Primes?')
+        self.assertEqual(list(primes.choices.filter(is_correct=True).values_list('text', flat=True)), ['2', '7'])
+
+    def test_gift_import_reaches_the_cached_paper(self):
+        attempt = ApplicantExam.objects.create(applicant=make_applicant('applicant'), exam=self.exam, total_questions=1)
+        applicant = client_for(attempt.applicant)
+        applicant.get(f'/api/take-exam/{attempt.uuid}/')
+
+        response = self.upload(
+            'bank.gift', '// comment\n::q1:: Capital of France? {=Paris ~Lyon ~Nice}\n\nThe sky is blue. {T}\n\nWhy? {}\n'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(self.exam.questions.order_by('id').values_list('question_type', flat=True)),
+            ['mcq', 'mcq', 'true_false', 'essay'],
+        )
+        questions = applicant.get(f'/api/take-exam/{attempt.uuid}/').json()['questions']
+        self.assertEqual(
+            [question['text'] for question in questions][1:], ['Capital of France?', 'The sky is blue.', 'Why?']
+        )
+
+    def test_invalid_question_rejects_the_whole_bank(self):
+        response = self.upload('bank.csv', 'question,A,B,answer\nFine?,yes,no,A\n,yes,no,C\nOne choice?,only,,A\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['question'] for error in response.json()['errors']], [2, 3])
+        self.assertEqual(self.exam.questions.count(), 1)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= and ?expand= decide what is serialized, and so what is queried"""
+
+    def setUp(self):
+        clear_caches()
+        self.exams = [make_exam(questions=3) for _ in range(3)]
+        self.client = APIClient()
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_exam_list_is_summarized_in_one_query(self):
+        exams = self.get('/api/exams/', 1)
+
+        self.assertEqual([exam['question_count'] for exam in exams], [3, 3, 3])
+        self.assertNotIn('questions', exams[0])
+
+    def test_expanded_list_prefetches(self):
+        exams = self.get('/api/exams/?expand=questions', 3)
+
+        self.assertEqual(len(exams[0]['questions']), 3)
+        self.assertEqual(len(exams[0]['questions'][0]['choices']), 2)
+
+    def test_fields_pick_the_keys(self):
+        exams = self.get('/api/exams/?fields=uuid,title', 1)
+        self.assertEqual(set(exams[0]), {'uuid', 'title'})
+
+        exam = self.get(f'/api/exams/{self.exams[0].uuid}/?fields=title', 1)
+        self.assertEqual(exam, {'title': 'Entrance Exam'})
+
+    def test_question_choices_only_when_expanded(self):
+        questions = self.get('/api/questions/?fields=uuid,text', 1)
+        self.assertEqual(set(questions[0]), {'uuid', 'text'})
+
+        questions = self.get('/api/questions/?expand=choices', 2)
+        self.assertEqual(len(questions), 9)
+        self.assertEqual(len(questions[0]['choices']), 2)
@@ -5,7 +5,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
-from api.views import RegistrationView, CurrentUserView
+from api.views import RegistrationView, CurrentUserView, LoginPoolStatusView
 
 #admin
 from api.services.admin_services import (
@@ -38,7 +38,7 @@ from api.services.applicant_services import(
     ApplicantExamSummaryView,
     ApplicantExamHistoryView,
     TakeExamViewSet,
-    
+    AdmissionTicketView,
 
 )
 router = DefaultRouter()
@@ -74,6 +74,7 @@ router.register(r'exam-summary', ApplicantExamSummaryView, basename='exam-summar
 
 router.register(r'exam-history', ApplicantExamHistoryView, basename='exam-history')
 router.register(r'take-exam', TakeExamViewSet, basename='take-exam')
+router.register(r'admission-tickets', AdmissionTicketView, basename='admission-tickets')
 
 
 
@@ -82,6 +83,7 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('token/pool-status/', LoginPoolStatusView.as_view(), name='token_pool_status'),
     path('users/me/', CurrentUserView.as_view(), name='user-detail'),
     
     #admin
@@ -0,0 +1,214 @@
+"""
+Queued admission for exam registration (settings.EXAM_ADMISSION_QUEUE).
+
+Apply requests only insert an AdmissionTicket. One worker per exam then
+admits pending tickets in FIFO order, a batch at a time: it locks the Exam
+row once, decides the whole batch in memory and writes it back with a
+bulk_create of attempts, one seats_taken UPDATE and a bulk_update of the
+tickets. Workers in other processes queue on the same row lock, so seats are
+never handed out twice.
+
+Tickets that find the exam full are waitlisted instead of rejected. The same
+worker promotes the waitlist, oldest first, whenever seats free up (a
+not_started attempt is cancelled or max_applicants is raised, see
+api/signals.py) and whenever a ticket is queued. Workers live in the web
+processes; process_admission_queue settles what a stopped one left behind.
+"""
+import logging
+import threading
+from collections import Counter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from api.models.exam import Exam, ApplicantExam, AdmissionTicket
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'EXAM_ADMISSION_BATCH_SIZE', 200)
+# Retry-After (seconds) for clients polling a ticket that is still waiting
+PENDING_RETRY_SECONDS = 2
+WAITLISTED_RETRY_SECONDS = 30
+
+_state_lock = threading.Lock()
+_workers = {}
+
+
+def is_enabled():
+    return getattr(settings, 'EXAM_ADMISSION_QUEUE', False)
+
+
+def is_open(exam):
+    return exam.is_active and not exam.is_expired and exam.date >= timezone.now().date()
+
+
+def enqueue(applicant, exam, status='pending'):
+    """
+    Queues an apply request (or puts it straight on the waitlist); a ticket
+    still pending or waitlisted for the same exam is reused. The worker is
+    woken either way: a seat may have freed up since the exam was found full.
+    """
+    ticket = AdmissionTicket.objects.filter(
+        applicant=applicant, exam=exam, status__in=['pending', 'waitlisted']
+    ).first()
+    if ticket is None:
+        ticket = AdmissionTicket.objects.create(applicant=applicant, exam=exam, status=status)
+    schedule_admission(exam.pk)
+    return ticket
+
+
+def has_waitlist(exam_id):
+    return AdmissionTicket.objects.filter(exam_id=exam_id, status='waitlisted').exists()
+
+
+def exams_to_process():
+    """Exams with pending tickets, or waitlisted ones and a free seat"""
+    return Exam.objects.filter(
+        Q(admission_tickets__status='pending')
+        | Q(admission_tickets__status='waitlisted', seats_taken__lt=F('max_applicants'))
+    ).values_list('pk', flat=True).distinct()
+
+
+def retry_after(ticket):
+    """
+    When the client should poll the ticket again, None once it is settled.
+    Nothing waits server-side: a herd of waiting applicants must not hold a
+    worker thread and a DB connection each.
+    """
+    if ticket.status == 'pending':
+        return PENDING_RETRY_SECONDS
+    if ticket.status == 'waitlisted':
+        return WAITLISTED_RETRY_SECONDS
+    return None
+
+
+def admit_batch(exam_id, batch_size=BATCH_SIZE):
+    """
+    Settles the next batch of an exam's queue with the same rules as
+    ApplyUpcomingExamSerializer: an active attempt is reused, then
+    max_attempts and free seats are checked in queue order. Waitlisted
+    tickets go first (only as many as there are free seats), then the
+    oldest pending ones; pending tickets that find no seat are waitlisted.
+    Returns the number of tickets that changed status.
+    """
+    with transaction.atomic():
+        exam = Exam.objects.select_for_update().filter(pk=exam_id).first()
+        if exam is None:
+            return 0
+        queue = AdmissionTicket.objects.filter(exam_id=exam_id).order_by('id')
+        free = exam.max_applicants - exam.seats_taken
+        tickets = []
+        if free > 0:
+            tickets = list(queue.filter(status='waitlisted')[:min(free, batch_size)])
+        tickets += list(queue.filter(status='pending')[:batch_size - len(tickets)])
+        if not tickets:
+            return 0
+
+        now = timezone.now()
+        applicant_ids = {ticket.applicant_id for ticket in tickets}
+        attempts = Counter()
+        active = {}
+        for applicant_id, pk, status in ApplicantExam.objects.filter(
+            exam_id=exam_id, applicant_id__in=applicant_ids
+        ).values_list('applicant_id', 'pk', 'status'):
+            attempts[applicant_id] += 1
+            if status != 'completed':
+                active[applicant_id] = pk
+
+        total_questions = exam.questions.count()
+        settled = len(tickets)
+        created = {}
+        for ticket in tickets:
+            ticket.processed_at = now
+            applicant_id = ticket.applicant_id
+            if not is_open(exam):
+                ticket.status, ticket.detail = 'rejected', "Exam does not exist or is not available."
+            elif applicant_id in active:
+                ticket.status, ticket.applicant_exam_id = 'admitted', active[applicant_id]
+            elif applicant_id in created:
+                ticket.status = 'admitted'
+            elif attempts[applicant_id] + 1 > exam.max_attempts:
+                ticket.status, ticket.detail = 'rejected', "You have reached the maximum allowed attempts for this exam."
+            elif free <= 0:
+                if ticket.status == 'waitlisted':
+                    settled -= 1
+                ticket.status, ticket.detail = 'waitlisted', "This exam is full, you are on its waitlist."
+            else:
+                free -= 1
+                ticket.status = 'admitted'
+                created[applicant_id] = ApplicantExam(
+                    applicant_id=applicant_id,
+                    exam=exam,
+                    started_at=None,
+                    status='not_started',
+                    total_questions=total_questions,
+                    exam_attempt_number=attempts[applicant_id] + 1,
+                )
+
+        if created:
+            ApplicantExam.objects.bulk_create(created.values())
+            Exam.objects.filter(pk=exam_id).update(seats_taken=F('seats_taken') + len(created))
+            # MySQL does not return ids from bulk_create, look them up by uuid
+            ids = dict(ApplicantExam.objects.filter(
+                uuid__in=[attempt.uuid for attempt in created.values()]
+            ).values_list('applicant_id', 'pk'))
+            for ticket in tickets:
+                if ticket.applicant_exam_id is None and ticket.applicant_id in created:
+                    ticket.applicant_exam_id = ids[ticket.applicant_id]
+
+        AdmissionTicket.objects.bulk_update(tickets, ['status', 'applicant_exam', 'detail', 'processed_at'])
+        return settled
+
+
+def process_queue(exam_id, batch_size=BATCH_SIZE):
+    """
+    Admits batches until no pending ticket is left and the waitlist cannot
+    move; returns the number of tickets that changed status.
+    """
+    total = 0
+    while True:
+        settled = admit_batch(exam_id, batch_size)
+        if not settled:
+            return total
+        total += settled
+
+
+def _run(exam_id):
+    try:
+        while True:
+            with _state_lock:
+                state = _workers[exam_id]
+                if not state['pending']:
+                    del _workers[exam_id]
+                    return
+                state['pending'] = False
+            try:
+                process_queue(exam_id)
+            except Exception:
+                logger.exception('Admission queue for exam %s failed', exam_id)
+    finally:
+        connection.close()
+
+
+def schedule_promotion(exam_id):
+    """Wakes the exam's worker after seats were freed, if anyone is waiting for one"""
+    if has_waitlist(exam_id):
+        schedule_admission(exam_id)
+
+
+def schedule_admission(exam_id):
+    """
+    Runs the exam's queue worker once the current transaction commits. There is
+    at most one worker per exam in a process; tickets that arrive while it is
+    busy are picked up by its next pass.
+    """
+    def start():
+        with _state_lock:
+            state = _workers.get(exam_id)
+            if state is not None:
+                state['pending'] = True
+                return
+            _workers[exam_id] = {'pending': True}
+        threading.Thread(target=_run, args=(exam_id,), name=f'exam-admission-{exam_id}', daemon=True).start()
+
+    transaction.on_commit(start)
@@ -0,0 +1,227 @@
+"""
+Write-behind journal for exam answers (settings.ANSWER_WRITE_BEHIND).
+
+Answers are appended to a local SQLite WAL file and drained into
+ApplicantAnswer in batches. Rows leave the journal only after the database
+commit and replaying a batch is idempotent, so a crash just means the
+leftovers are drained on the next start.
+
+A drain locks the attempts it writes to, skipping those locked by a
+completion, which drains them itself under that lock (see
+TakeExamViewSet.complete). Answers of attempts no longer in progress are
+dropped, so nothing lands on a graded attempt.
+"""
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from functools import partial
+from django.conf import settings
+from django.db import connection, transaction, close_old_connections
+from api.models.exam import ApplicantExam
+from api.utils.answers import upsert_answers, recount_answers
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'ANSWER_JOURNAL_FLUSH_INTERVAL', 0.5)
+BATCH_SIZE = getattr(settings, 'ANSWER_JOURNAL_BATCH_SIZE', 500)
+LEASE_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    applicant_exam_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    choice_id INTEGER NOT NULL,
+    is_correct INTEGER NOT NULL,
+    question_version INTEGER,
+    time_spent_seconds INTEGER,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_attempt ON answers (applicant_exam_id, id);
+CREATE TABLE IF NOT EXISTS lease (
+    name TEXT PRIMARY KEY,
+    owner TEXT,
+    expires_at REAL NOT NULL
+);
+INSERT OR IGNORE INTO lease (name, owner, expires_at) VALUES ('drain', NULL, 0);
+"""
+
+_local = threading.local()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'ANSWER_WRITE_BEHIND', False)
+
+
+def _connection():
+    # sqlite3 connections are not shareable across threads
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        path = getattr(settings, 'ANSWER_JOURNAL_PATH', settings.BASE_DIR / 'answer_journal.sqlite3')
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.executescript(SCHEMA)
+        # journals written before question_version was recorded
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(answers)')}
+        if 'question_version' not in columns:
+            conn.execute('ALTER TABLE answers ADD COLUMN question_version INTEGER')
+        _local.conn = conn
+    return conn
+
+
+def append(applicant_exam_id, entry, time_spent_seconds):
+    """Durably records a graded answer (an AnswerKeyEntry) for later draining"""
+    append_many(applicant_exam_id, [(entry, time_spent_seconds)])
+
+
+def append_many(applicant_exam_id, answers):
+    """append() for a batch of (entry, time_spent_seconds), in one journal transaction"""
+    now = time.time()
+    conn = _connection()
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO answers (applicant_exam_id, question_id, choice_id, is_correct, question_version, time_spent_seconds, recorded_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [
+            (applicant_exam_id, entry.question_id, entry.choice_id, int(entry.is_correct), entry.question_version,
+             time_spent_seconds, now)
+            for entry, time_spent_seconds in answers
+        ]
+    )
+    conn.execute('COMMIT')
+    start_flusher()
+
+
+class _DrainLease:
+    """
+    Cross-process lock stored in the journal itself, so drains are
+    serialized (and applied in journal order) without blocking appends.
+    """
+
+    def __init__(self, wait):
+        self.wait = wait
+        self.owner = uuid.uuid4().hex
+
+    def __enter__(self):
+        conn = _connection()
+        deadline = time.time() + self.wait
+        while True:
+            now = time.time()
+            acquired = conn.execute(
+                "UPDATE lease SET owner = ?, expires_at = ? WHERE name = 'drain' AND expires_at < ?",
+                (self.owner, now + LEASE_SECONDS, now)
+            ).rowcount
+            if acquired:
+                return self
+            if now >= deadline:
+                raise TimeoutError('Answer journal is being drained by another worker')
+            time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        _connection().execute(
+            "UPDATE lease SET owner = NULL, expires_at = 0 WHERE name = 'drain' AND owner = ?",
+            (self.owner,)
+        )
+
+
+def drain(applicant_exam_id=None, limit=BATCH_SIZE, wait=0):
+    """
+    Writes up to `limit` of the oldest journaled answers (optionally only one
+    attempt's) to ApplicantAnswer and removes them from the journal.
+    Returns the number of journal rows consumed.
+    """
+    return _drain(applicant_exam_id, limit, wait)[0]
+
+
+def _drain(applicant_exam_id, limit, wait, after=0):
+    """drain() of the rows after id `after`: (rows consumed, last id read or None)"""
+    conn = _connection()
+    with _DrainLease(wait):
+        sql = 'SELECT id, applicant_exam_id, question_id, choice_id, is_correct, question_version, time_spent_seconds FROM answers WHERE id > ?'
+        params = (after,)
+        if applicant_exam_id is not None:
+            sql += ' AND applicant_exam_id = ?'
+            params += (applicant_exam_id,)
+        rows = conn.execute(sql + ' ORDER BY id LIMIT ?', params + (limit,)).fetchall()
+        if not rows:
+            return 0, None
+
+        by_attempt = {}
+        for _, attempt_id, question_id, choice_id, is_correct, question_version, time_spent in rows:
+            by_attempt.setdefault(attempt_id, []).append({
+                'question_id': question_id,
+                'choice_id': choice_id,
+                'is_correct': bool(is_correct),
+                'question_version': question_version,
+                'time_spent_seconds': time_spent,
+            })
+
+        attempts = ApplicantExam.objects.filter(pk__in=by_attempt.keys())
+        with transaction.atomic():
+            # an attempt being completed is left in the journal, its completion drains it
+            locked = dict(attempts.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            ).order_by('pk').values_list('pk', 'status'))
+            busy = set(attempts.values_list('pk', flat=True)) - locked.keys()
+            live = {pk for pk, status in locked.items() if status == 'in_progress'}
+            for attempt_id in live:
+                upsert_answers(attempt_id, by_attempt[attempt_id])
+            recount_answers(live)
+
+        # deleted attempts would fail the whole batch on their FK, graded ones must not change
+        dropped = by_attempt.keys() - live - busy
+        if dropped:
+            logger.warning('Dropped journaled answers for missing or finished attempts %s', sorted(dropped))
+
+        ids = [row[0] for row in rows if row[1] not in busy]
+        # inside a completion's transaction the rows go once it commits
+        transaction.on_commit(partial(_forget, ids))
+        return len(ids), rows[-1][0]
+
+
+def _forget(ids):
+    conn = _connection()
+    conn.execute('BEGIN')
+    conn.executemany('DELETE FROM answers WHERE id = ?', [(i,) for i in ids])
+    conn.execute('COMMIT')
+
+
+def flush(applicant_exam_id=None, wait=LEASE_SECONDS):
+    """
+    Drains the journal (or one attempt's part of it) completely, but for the
+    attempts another completion holds
+    """
+    total, after = 0, 0
+    while True:
+        drained, after = _drain(applicant_exam_id, BATCH_SIZE, wait, after)
+        if after is None:
+            return total
+        total += drained
+
+
+def _run_flusher():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            while drain():
+                pass
+        except TimeoutError:
+            pass
+        except Exception:
+            logger.exception('Answer journal flush failed, will retry')
+        finally:
+            close_old_connections()
+
+
+def start_flusher():
+    """Starts the background flusher once per process; it also replays leftovers from a crash"""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run_flusher, name='answer-journal-flusher', daemon=True)
+            _flusher.start()
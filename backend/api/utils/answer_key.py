@@ -0,0 +1,54 @@
+from collections import namedtuple
+from django.conf import settings
+from api.models.exam import Choice
+from api.utils.cache import LocalLRU, get_or_build
+
+AnswerKeyEntry = namedtuple('AnswerKeyEntry', ['question_id', 'choice_id', 'is_correct', 'question_version'])
+
+_keys = LocalLRU(maxsize=getattr(settings, 'ANSWER_KEY_CACHE_SIZE', 64))
+
+
+class AnswerKey:
+    """
+    Per-exam grading index: choice UUID -> (question id, choice id, is_correct,
+    question version).
+    Built from one query and cached per exam content_version, so grading
+    an answer is a dict lookup.
+    """
+
+    def __init__(self, rows):
+        self.choices = {}
+        self.questions = {}
+        self._by_choice_id = {}
+        for choice_uuid, choice_id, is_correct, question_id, question_uuid, question_version in rows:
+            entry = AnswerKeyEntry(question_id, choice_id, is_correct, question_version)
+            self.choices[choice_uuid] = entry
+            self._by_choice_id[choice_id] = entry
+            self.questions[question_uuid] = question_id
+
+    def lookup(self, question_uuid, choice_uuid):
+        """Returns the entry for the choice, or None if it is not an option of that question"""
+        entry = self.choices.get(choice_uuid)
+        if entry is None or self.questions.get(question_uuid) != entry.question_id:
+            return None
+        return entry
+
+    def entry(self, choice_id):
+        return self._by_choice_id.get(choice_id)
+
+    def is_correct(self, choice_id):
+        entry = self.entry(choice_id)
+        return entry.is_correct if entry else False
+
+
+def build_answer_key(exam):
+    rows = Choice.objects.filter(question__exam_id=exam.pk).values_list(
+        'uuid', 'id', 'is_correct', 'question_id', 'question__uuid', 'question__version'
+    )
+    return AnswerKey(rows)
+
+
+def get_answer_key(exam):
+    """Returns the answer key for the exam's current content version"""
+    key = f"answer_key:{exam.pk}:{exam.content_version}"
+    return get_or_build(_keys, key, lambda: build_answer_key(exam))
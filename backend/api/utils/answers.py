@@ -0,0 +1,60 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from api.models.exam import ApplicantExam, ApplicantAnswer
+
+
+def is_suspected(time_spent_seconds, tab_switch_count=0):
+    """Same thresholds as ApplicantAnswer.save()"""
+    return tab_switch_count > 3 or (time_spent_seconds or 0) > 600
+
+
+def upsert_answers(applicant_exam_id, rows):
+    """
+    Writes graded answers for one attempt with one read, one bulk_update and
+    one bulk_create. Each row is a dict with question_id, choice_id, is_correct,
+    question_version and time_spent_seconds; later rows for the same question win.
+    Must be called inside a transaction.
+    """
+    rows = {row['question_id']: row for row in rows}
+    existing = {
+        answer.question_id: answer
+        for answer in ApplicantAnswer.objects.filter(
+            applicant_exam_id=applicant_exam_id,
+            question_id__in=rows.keys()
+        )
+    }
+
+    to_update, to_create = [], []
+    for question_id, row in rows.items():
+        answer = existing.get(question_id)
+        if answer is None:
+            answer = ApplicantAnswer(applicant_exam_id=applicant_exam_id, question_id=question_id)
+            to_create.append(answer)
+        else:
+            to_update.append(answer)
+        answer.selected_choice_id = row['choice_id']
+        answer.is_correct = row['is_correct']
+        answer.question_version = row['question_version']
+        answer.time_spent_seconds = row['time_spent_seconds']
+        answer.suspected_flag = answer.suspected_flag or is_suspected(
+            row['time_spent_seconds'], answer.tab_switch_count
+        )
+
+    if to_update:
+        ApplicantAnswer.objects.bulk_update(
+            to_update, ['selected_choice', 'is_correct', 'question_version', 'time_spent_seconds', 'suspected_flag']
+        )
+    if to_create:
+        ApplicantAnswer.objects.bulk_create(to_create)
+    return len(to_create), len(to_update)
+
+
+def recount_answers(applicant_exam_ids):
+    """Recomputes attempted_questions/correct_answers from ApplicantAnswer in one UPDATE"""
+    answers = ApplicantAnswer.objects.filter(applicant_exam=OuterRef('pk')).order_by().values('applicant_exam')
+    attempted = answers.annotate(n=Count('id')).values('n')
+    correct = answers.filter(is_correct=True).annotate(n=Count('id')).values('n')
+    return ApplicantExam.objects.filter(pk__in=applicant_exam_ids).update(
+        attempted_questions=Coalesce(Subquery(attempted), 0),
+        correct_answers=Coalesce(Subquery(correct), 0),
+    )
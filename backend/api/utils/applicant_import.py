@@ -0,0 +1,227 @@
+"""
+Bulk applicant import, for SuperAdminApplicantsViewSet.import_applicants and
+the import_applicants command. Rows are validated with the registration
+rules; uniqueness against the database is one query per chunk; users and
+profiles are written with bulk_create, one transaction per chunk. Every
+rejected row is reported.
+
+Hashing a password takes a third of a second, so the endpoint does not
+import in the request: submit() records an ApplicantImport job and hands the
+rows to this process' import thread, which hashes them in a process pool
+kept for the life of the process; the report is polled from the job. The
+rows stay in memory, so no password reaches the job table, and a job
+interrupted by a restart stays unfinished and has to be submitted again.
+
+bulk_create skips the model signals, so the search index is written here.
+Imported profiles have no course_applied, so the course statistics do not
+change.
+"""
+import csv
+import io
+import json
+import logging
+import queue
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from api.models.auth import ApplicantImport, ApplicantProfile
+from api.serializers.RegistrationSerializers import ApplicantImportRowSerializer
+from api.utils.login_pool import WORKERS, make_pool
+from api.utils.search import index_profiles
+
+CHUNK_SIZE = 500
+MAX_ROWS = 20000
+# below this many passwords the pool round trip costs more than it saves
+POOL_THRESHOLD = 20
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'password')
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool = None
+_runner = None
+_jobs = queue.Queue()
+
+
+def json_rows(data):
+    """Rows of parsed JSON: a list of applicants or {"applicants": [...]}"""
+    if isinstance(data, dict):
+        data = data.get('applicants')
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ValueError('Expected a list of applicants or {"applicants": [...]}.')
+    return data
+
+
+def read_rows(content, file_type):
+    """Rows of a CSV (header line first) or JSON document, text or bytes"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if file_type == 'json':
+        return json_rows(json.loads(content))
+    # empty cells count as missing, so optional dates and numbers can be left blank
+    return [
+        {name.strip(): value.strip() for name, value in row.items() if name and value and value.strip()}
+        for row in csv.DictReader(io.StringIO(content))
+    ]
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = make_pool(WORKERS)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        _pool = None
+
+
+def hash_passwords(passwords, in_pool=False):
+    if not in_pool or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    try:
+        return list(_get_pool().map(make_password, passwords, chunksize=max(1, len(passwords) // (WORKERS * 4))))
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+
+
+def _validate(rows):
+    valid, errors = [], []
+    usernames, emails = set(), set()
+    for number, row in enumerate(rows, start=1):
+        serializer = ApplicantImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'row': number, 'errors': serializer.errors})
+            continue
+        data = dict(serializer.validated_data)
+        # as create_user() would store them
+        data['username'] = User.normalize_username(data['username'])
+        data['email'] = User.objects.normalize_email(data['email'])
+        problems = {}
+        if data['username'] in usernames:
+            problems['username'] = 'Duplicate username in this file.'
+        if data['email'] in emails:
+            problems['email'] = 'Duplicate email in this file.'
+        if problems:
+            errors.append({'row': number, 'errors': problems})
+            continue
+        usernames.add(data['username'])
+        emails.add(data['email'])
+        valid.append((number, data))
+    return valid, errors
+
+
+def _unique(chunk, errors):
+    """Rows of the chunk whose username and email are still free, one query"""
+    taken_usernames, taken_emails = set(), set()
+    for username, email in User.objects.filter(
+        Q(username__in=[data['username'] for _, data in chunk]) | Q(email__in=[data['email'] for _, data in chunk])
+    ).values_list('username', 'email'):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+
+    fresh = []
+    for number, data in chunk:
+        problems = {}
+        if data['username'] in taken_usernames:
+            problems['username'] = 'This username is already taken.'
+        if data['email'] in taken_emails:
+            problems['email'] = 'This email is already in use.'
+        if problems:
+            errors.append({'row': number, 'errors': problems})
+        else:
+            fresh.append((number, data))
+    return fresh
+
+
+def _create(chunk, errors):
+    users = [User(**{field: data[field] for field in USER_FIELDS}) for _, data in chunk]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            # MySQL does not return ids from bulk_create, look them up by username
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+            ApplicantProfile.objects.bulk_create([
+                ApplicantProfile(
+                    user_id=ids[data['username']],
+                    **{name: value for name, value in data.items() if name not in USER_FIELDS}
+                )
+                for _, data in chunk
+            ])
+    except IntegrityError:
+        for number, _ in chunk:
+            errors.append({'row': number, 'errors': {
+                'non_field_errors': ['Conflicts with an account created during the import, please retry this row.']
+            }})
+        return 0
+    index_profiles(ApplicantProfile.objects.select_related('user').filter(user_id__in=ids.values()))
+    return len(chunk)
+
+
+def import_applicants(rows, dry_run=False, chunk_size=CHUNK_SIZE, in_pool=False):
+    """
+    Imports applicant rows (dicts with the RegisterSerializer fields).
+    Returns {'total', 'imported', 'dry_run', 'errors'}; rows are numbered
+    from 1 and a dry run only validates. in_pool hashes the passwords in the
+    process' hashing pool.
+    """
+    valid, errors = _validate(rows)
+    chunks = [_unique(valid[start:start + chunk_size], errors) for start in range(0, len(valid), chunk_size)]
+    imported = sum(len(chunk) for chunk in chunks)
+
+    if not dry_run:
+        fresh = [data for chunk in chunks for _, data in chunk]
+        for data, encoded in zip(fresh, hash_passwords([data['password'] for data in fresh], in_pool)):
+            data['password'] = encoded
+        imported = sum(_create(chunk, errors) for chunk in chunks if chunk)
+
+    errors.sort(key=lambda error: error['row'])
+    return {'total': len(rows), 'imported': imported, 'dry_run': dry_run, 'errors': errors}
+
+
+def submit(rows, dry_run=False, user=None):
+    """Records an import job, run by the import thread once the transaction commits"""
+    job = ApplicantImport.objects.create(created_by=user, dry_run=dry_run, total=len(rows))
+    transaction.on_commit(partial(_enqueue, job.pk, rows, dry_run))
+    return job
+
+
+def _enqueue(job_id, rows, dry_run):
+    global _runner
+    _jobs.put((job_id, rows, dry_run))
+    with _lock:
+        if _runner is None or not _runner.is_alive():
+            # one import at a time, they would only compete for the pool
+            _runner = threading.Thread(target=_run, name='applicant-import', daemon=True)
+            _runner.start()
+
+
+def _run():
+    while True:
+        job = _jobs.get()
+        try:
+            run_job(*job)
+        finally:
+            connection.close()
+
+
+def run_job(job_id, rows, dry_run):
+    """Runs a submitted import and stores its report on the job"""
+    jobs = ApplicantImport.objects.filter(pk=job_id)
+    jobs.update(status='running')
+    try:
+        report = import_applicants(rows, dry_run=dry_run, in_pool=True)
+    except Exception:
+        logger.exception('Applicant import %s failed', job_id)
+        jobs.update(status='failed', finished_at=timezone.now())
+        return
+    jobs.update(status='done', report=report, finished_at=timezone.now())
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+from django.core.cache import cache
+
+# versioned keys never go stale, this only bounds how long they linger
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+class LocalLRU:
+    """Small thread-safe, process-local LRU used in front of the Django cache"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_or_build(lru, key, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Looks up key in the local LRU, then in the shared Django cache,
+    and only calls builder() when both miss. Keys must embed a version
+    so stale entries are never returned, only left to expire.
+    """
+    value = lru.get(key)
+    if value is not None:
+        return value
+
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+
+    lru.set(key, value)
+    return value
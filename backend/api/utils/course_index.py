@@ -0,0 +1,75 @@
+import time
+from bisect import bisect_left
+from decimal import Decimal
+from django.db.models import Count, Max, Sum
+from api.models.admission import Course
+from api.utils.cache import LocalLRU, get_or_build
+
+# how long a process trusts the version it read last
+CHECK_SECONDS = 2
+
+_indexes = LocalLRU(maxsize=4)
+
+
+class CourseIndex:
+    """
+    Courses sorted by min_score (highest first, then id) so recommendation
+    and eligibility are a bisect instead of a Course query per attempt.
+    Courses without a min_score are never eligible, as with min_score__lte.
+    """
+
+    def __init__(self, courses):
+        self.courses = sorted(
+            (course for course in courses if course.min_score is not None),
+            key=lambda course: (-course.min_score, course.id)
+        )
+        self._keys = [-course.min_score for course in self.courses]
+
+    def _first_eligible(self, score):
+        if isinstance(score, float):
+            score = Decimal(str(score))
+        return bisect_left(self._keys, -score)
+
+    def recommend(self, score):
+        """The course with the highest min_score the score reaches, or None"""
+        if score is None:
+            return None
+        i = self._first_eligible(score)
+        return self.courses[i] if i < len(self.courses) else None
+
+    def eligible(self, score):
+        """Every course the score reaches, highest min_score first"""
+        if score is None:
+            return []
+        return self.courses[self._first_eligible(score):]
+
+
+_checked = {}
+
+
+def _version():
+    """
+    Changes whenever a course is created, saved or deleted. It is read from
+    the DB, so a change made by any process reaches every other one within
+    CHECK_SECONDS.
+    """
+    checked = _checked.get('version')
+    if checked is not None and checked[0] > time.monotonic():
+        return checked[1]
+    versions = Course.objects.aggregate(courses=Count('id'), total=Sum('version'), last=Max('id'))
+    # the highest id tells a deleted course from one created in its place
+    version = f"{versions['courses']}.{versions['total'] or 0}.{versions['last'] or 0}"
+    _checked['version'] = (time.monotonic() + CHECK_SECONDS, version)
+    return version
+
+
+def bump_course_index(course_id=None):
+    """Call after a course was saved (course_id) or deleted"""
+    if course_id is not None:
+        Course.bump_version(course_id)
+    _checked.clear()
+
+
+def get_course_index():
+    """Returns the course threshold index, rebuilt after any Course save/delete"""
+    return get_or_build(_indexes, f"course_index:{_version()}", lambda: CourseIndex(Course.objects.all()))
@@ -0,0 +1,90 @@
+"""
+Score distributions of a filtered set of completed attempts. The scores are
+read with one values_list query into a NumPy array, everything else is
+vectorized, and the result is cached under the results_version of the
+exams involved so it is recomputed only after results actually change.
+"""
+import hashlib
+import numpy as np
+from django.db.models import Count, Sum
+from api.models.exam import Exam
+from api.utils.cache import LocalLRU, get_or_build
+
+QUANTILES = (10, 25, 50, 75, 90)
+DEFAULT_BINS = 10
+MAX_BINS = 100
+
+_distributions = LocalLRU(maxsize=32)
+
+
+def percentile_ranks(scores):
+    """Mid-rank percentile of each score within `scores`: % below plus half of % equal"""
+    ordered = np.sort(scores)
+    below = np.searchsorted(ordered, scores, side='left')
+    at_or_below = np.searchsorted(ordered, scores, side='right')
+    return (below + at_or_below) / 2 / len(scores) * 100
+
+
+def describe(scores, bins=DEFAULT_BINS):
+    """Summary, quantiles and a 0-100 histogram of a float array"""
+    counts, edges = np.histogram(scores, bins=bins, range=(0, 100))
+    summary = {
+        'count': int(scores.size),
+        'histogram': [
+            {'from': round(float(low), 2), 'to': round(float(high), 2), 'count': int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ],
+    }
+    if not scores.size:
+        return {**summary, 'mean': None, 'std': None, 'min': None, 'max': None, 'quantiles': None}
+    return {
+        **summary,
+        'mean': round(float(scores.mean()), 2),
+        'std': round(float(scores.std()), 2),
+        'min': float(scores.min()),
+        'max': float(scores.max()),
+        'quantiles': {
+            f'p{q}': round(float(value), 2)
+            for q, value in zip(QUANTILES, np.percentile(scores, QUANTILES))
+        },
+    }
+
+
+def results_version(exam_uuid=None):
+    """Changes whenever a result of the exam (or of any exam) changes"""
+    exams = Exam.objects.all()
+    if exam_uuid:
+        exams = exams.filter(uuid=exam_uuid)
+    versions = exams.aggregate(exams=Count('id'), total=Sum('results_version'))
+    return f"{versions['exams']}.{versions['total'] or 0}"
+
+
+def score_distribution(queryset, params, bins=DEFAULT_BINS, ranks=False):
+    """
+    Distribution of the completed attempts in `queryset`, which was filtered
+    with the request `params` (they are part of the cache key). With `ranks`
+    every attempt's percentile rank within the set is included too.
+    Searches are not cached, renaming an applicant does not change any
+    results version.
+    """
+    filters = '&'.join(f'{name}={value}' for name, value in sorted(params.items()))
+    key = 'distribution:{}:{}:{}:{}'.format(
+        results_version(params.get('exam')), bins, int(ranks), hashlib.md5(filters.encode()).hexdigest()
+    )
+
+    def build():
+        rows = list(queryset.filter(recommendation_score__isnull=False).order_by().values_list(
+            'uuid', 'recommendation_score'
+        ))
+        scores = np.array([score for _, score in rows], dtype=float)
+        result = describe(scores, bins)
+        if ranks:
+            result['ranks'] = [
+                {'uuid': str(uuid), 'score': float(score), 'percentile_rank': round(float(rank), 2)}
+                for (uuid, _), score, rank in zip(rows, scores, percentile_ranks(scores) if scores.size else [])
+            ]
+        return result
+
+    if params.get('search'):
+        return build()
+    return get_or_build(_distributions, key, build)
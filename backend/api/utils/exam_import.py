@@ -0,0 +1,155 @@
+"""
+Bulk exam authoring: question banks in JSON, CSV or a GIFT-like text format
+are parsed, validated as a whole and then written with two bulk_creates (all
+questions, then all choices), instead of one INSERT per row.
+
+JSON: a list of questions or {"questions": [...]}, each
+    {"text", "question_type" (default mcq), "choices": [{"label" (optional),
+    "text", "is_correct"}]}
+CSV: a header line with question, optional question_type, one column per
+    choice label (A, B, C, ...) and answer (the correct label(s), e.g. "B"
+    or "A,C")
+GIFT-like: one question per blank-line separated block,
+    Capital of France? {=Paris ~Lyon ~Nice}
+    {T} / {F} make a true/false question and {} an essay. ::title:: prefixes
+    and // comment lines are ignored; escapes are not supported.
+
+bulk_create skips the model signals, so the exam content_version is bumped here.
+"""
+import csv
+import itertools
+import re
+from string import ascii_uppercase
+from django.db import transaction
+from api.models.exam import Exam, Question, Choice, QUESTION_TYPES
+
+MAX_QUESTIONS = 5000
+FILE_TYPES = ('json', 'csv', 'gift')
+
+_gift_answer = re.compile(r'([=~])([^=~]*)')
+
+
+def json_questions(data):
+    if isinstance(data, dict):
+        data = data.get('questions')
+    if not isinstance(data, list) or not all(isinstance(question, dict) for question in data):
+        raise ValueError('Expected a list of questions or {"questions": [...]}.')
+    return [
+        {
+            'text': str(question.get('text') or '').strip(),
+            'question_type': question.get('question_type') or 'mcq',
+            'choices': [
+                {
+                    'label': str(choice.get('label') or '').strip(),
+                    'text': str(choice.get('text') or '').strip(),
+                    'is_correct': choice.get('is_correct') is True,
+                }
+                for choice in question.get('choices') or [] if isinstance(choice, dict)
+            ],
+        }
+        for question in data
+    ]
+
+
+def csv_questions(lines):
+    for row in csv.DictReader(lines):
+        row = {(name or '').strip(): (value or '').strip() for name, value in row.items()}
+        answer = {label.strip().upper() for label in row.get('answer', '').replace(';', ',').split(',') if label.strip()}
+        yield {
+            'text': row.get('question', ''),
+            'question_type': row.get('question_type') or 'mcq',
+            'choices': [
+                {'label': label, 'text': row[label], 'is_correct': label in answer}
+                for label in sorted(name for name in row if len(name) == 1 and name in ascii_uppercase)
+                if row[label]
+            ],
+        }
+
+
+def _gift_question(text):
+    text = re.sub(r'^::.*?::', '', text).strip()
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        return {'text': text, 'question_type': 'mcq', 'choices': []}
+    stem = f"{text[:start].strip()} {text[end + 1:].strip()}".strip()
+    body = text[start + 1:end].strip()
+    if not body:
+        return {'text': stem, 'question_type': 'essay', 'choices': []}
+    if body.upper() in ('T', 'TRUE', 'F', 'FALSE'):
+        true = body.upper().startswith('T')
+        return {'text': stem, 'question_type': 'true_false', 'choices': [
+            {'label': 'A', 'text': 'True', 'is_correct': true},
+            {'label': 'B', 'text': 'False', 'is_correct': not true},
+        ]}
+    return {'text': stem, 'question_type': 'mcq', 'choices': [
+        {'label': '', 'text': value.strip(), 'is_correct': mark == '='}
+        for mark, value in _gift_answer.findall(body)
+    ]}
+
+
+def gift_questions(lines):
+    block = []
+    for line in itertools.chain(lines, ['']):
+        line = line.strip()
+        if line.startswith('//'):
+            continue
+        if line:
+            block.append(line)
+        elif block:
+            yield _gift_question(' '.join(block))
+            block = []
+
+
+def read_questions(lines, file_type):
+    """Parses an iterable of text lines (an upload is read line by line)"""
+    if file_type == 'csv':
+        return list(itertools.islice(csv_questions(lines), MAX_QUESTIONS + 1))
+    return list(itertools.islice(gift_questions(lines), MAX_QUESTIONS + 1))
+
+
+def validate(questions):
+    """Fills in missing choice labels; returns [{'question': number, 'errors': [...]}]"""
+    types = dict(QUESTION_TYPES)
+    errors = []
+    if len(questions) > MAX_QUESTIONS:
+        return [{'question': MAX_QUESTIONS + 1, 'errors': [f'At most {MAX_QUESTIONS} questions per import.']}]
+    for number, question in enumerate(questions, start=1):
+        problems = []
+        choices = question['choices']
+        for label, choice in zip(ascii_uppercase, choices):
+            choice['label'] = choice['label'] or label
+        if not question['text']:
+            problems.append('The question text is empty.')
+        if question['question_type'] not in types:
+            problems.append(f"Unknown question type {question['question_type']!r}.")
+        elif question['question_type'] != 'essay':
+            if len(choices) < 2:
+                problems.append('A question needs at least two choices.')
+            if not any(choice['is_correct'] for choice in choices):
+                problems.append('No choice is marked correct.')
+        labels = [choice['label'] for choice in choices]
+        if len(choices) > len(ascii_uppercase) or any(label not in ascii_uppercase or len(label) != 1 for label in labels):
+            problems.append('Choice labels must be single letters A-Z.')
+        elif len(set(labels)) != len(labels):
+            problems.append('Choice labels must be unique.')
+        if any(not choice['text'] or len(choice['text']) > 255 for choice in choices):
+            problems.append('Every choice needs a text of at most 255 characters.')
+        if problems:
+            errors.append({'question': number, 'errors': problems})
+    return errors
+
+
+def create_questions(exam, questions):
+    """Inserts validated questions and their choices with one bulk_create each"""
+    rows = [Question(exam=exam, text=question['text'], question_type=question['question_type']) for question in questions]
+    with transaction.atomic():
+        Question.objects.bulk_create(rows)
+        # MySQL does not return ids from bulk_create, look them up by uuid
+        ids = dict(Question.objects.filter(uuid__in=[row.uuid for row in rows]).values_list('uuid', 'pk'))
+        Choice.objects.bulk_create([
+            Choice(question_id=ids[row.uuid], label=choice['label'], text=choice['text'], is_correct=choice['is_correct'])
+            for row, question in zip(rows, questions)
+            for choice in question['choices']
+        ])
+        Exam.bump_content_version(exam.pk)
+    return len(rows)
@@ -0,0 +1,47 @@
+import json
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from api.models.exam import Question
+from api.utils.cache import LocalLRU, get_or_build
+
+_papers = LocalLRU(maxsize=getattr(settings, 'EXAM_PAPER_CACHE_SIZE', 64))
+
+
+def paper_key(exam):
+    return f"exam_paper:{exam.pk}:{exam.content_version}"
+
+
+def compile_exam_paper(exam):
+    """
+    Builds the applicant-facing question list for an exam (answers stripped)
+    and returns it as compact JSON bytes. Two queries regardless of size.
+    """
+    questions = Question.objects.filter(exam_id=exam.pk).prefetch_related('choices')
+    paper = [
+        {
+            'uuid': str(question.uuid),
+            'text': question.text,
+            'question_type': question.question_type,
+            'choices': [
+                {
+                    'uuid': str(choice.uuid),
+                    'label': choice.label,
+                    'text': choice.text,
+                }
+                for choice in question.choices.all()
+            ]
+        }
+        for question in questions
+    ]
+    return json.dumps(paper, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def get_exam_paper(exam):
+    """Returns the compiled paper for the exam's current content version"""
+    return get_or_build(_papers, paper_key(exam), lambda: compile_exam_paper(exam))
+
+
+def render_with_paper(data, paper):
+    """Renders serializer data to JSON and splices the precompiled paper in as 'questions'"""
+    body = JSONRenderer().render(data)
+    return body[:-1] + b',"questions":' + paper + b'}'
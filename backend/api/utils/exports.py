@@ -0,0 +1,135 @@
+"""
+Streaming exports of exam results. Rows come from a values_list() iterator,
+one chunk of attempts at a time (per-question answers too), so memory stays
+flat whatever the number of attempts. The app is served over ASGI, where
+StreamingHttpResponse would first collect a sync iterator into a list, so
+the responses stream async generators.
+"""
+import csv
+import datetime
+import tempfile
+import uuid
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from api.models.exam import Question, ApplicantAnswer
+
+CHUNK_SIZE = 2000
+
+RESULT_COLUMNS = [
+    ('Attempt', 'uuid'),
+    ('First Name', 'applicant__user__first_name'),
+    ('Last Name', 'applicant__user__last_name'),
+    ('Email', 'applicant__user__email'),
+    ('Contact Number', 'applicant__contact_number'),
+    ('Exam', 'exam__title'),
+    ('Exam Date', 'exam__date'),
+    ('Attempt Number', 'exam_attempt_number'),
+    ('Total Questions', 'total_questions'),
+    ('Attempted', 'attempted_questions'),
+    ('Correct', 'correct_answers'),
+    ('Score', 'recommendation_score'),
+    ('Recommended Course', 'recommended_course__code'),
+    ('Started At', 'started_at'),
+    ('Completed At', 'completed_at'),
+]
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _next_lines(rows, questions, chunk_size):
+    """The next chunk of attempts from the `rows` iterator as export lines, [] at the end"""
+    chunk = list(islice(rows, chunk_size))
+    answers = {}
+    if chunk and questions:
+        for attempt_id, question_id, label in ApplicantAnswer.objects.filter(
+            applicant_exam_id__in=[row[0] for row in chunk]
+        ).values_list('applicant_exam_id', 'question_id', 'selected_choice__label'):
+            answers[attempt_id, question_id] = label
+    return [
+        list(row[1:]) + [answers.get((row[0], question_id), '') for question_id in questions]
+        for row in chunk
+    ]
+
+
+async def result_rows(queryset, exam=None, chunk_size=CHUNK_SIZE):
+    """
+    Async generator of the header and then one list per attempt. With `exam`
+    every question of that exam gets a column holding the selected choice label.
+    """
+    questions = []
+    if exam is not None:
+        questions = [pk async for pk in Question.objects.filter(exam=exam).order_by('id').values_list('id', flat=True)]
+    yield [header for header, _ in RESULT_COLUMNS] + [f'Q{number}' for number in range(1, len(questions) + 1)]
+
+    fields = ['id'] + [field for _, field in RESULT_COLUMNS]
+    # QuerySet.aiterator() runs a values_list() query in the event loop, so the
+    # lazy sync iterator is advanced one chunk at a time in the ORM thread instead
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        lines = await sync_to_async(_next_lines)(rows, questions, chunk_size)
+        if not lines:
+            return
+        for line in lines:
+            yield line
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _attachment(response, filename):
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def csv_response(rows, filename):
+    """`rows` is an async iterable, see result_rows()"""
+    writer = csv.writer(_Echo())
+
+    async def lines():
+        async for row in rows:
+            yield writer.writerow(row)
+
+    return _attachment(StreamingHttpResponse(lines(), content_type='text/csv'), filename)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    # Excel has no timezones
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def xlsx_response(rows, filename):
+    """
+    XLSX is a zip archive and cannot be produced front to back, so the rows
+    (an async iterable) go through openpyxl's write-only mode into a
+    temporary file which is then streamed. openpyxl is only imported for
+    this format.
+    """
+    from openpyxl import Workbook
+
+    async def chunks():
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Results')
+        async for row in rows:
+            sheet.append([_xlsx_cell(value) for value in row])
+
+        with tempfile.TemporaryFile() as spool:
+            # zipping the sheet is CPU work, keep it off the event loop
+            await sync_to_async(workbook.save, thread_sensitive=False)(spool)
+            spool.seek(0)
+            while True:
+                data = spool.read(64 * 1024)
+                if not data:
+                    return
+                yield data
+
+    return _attachment(StreamingHttpResponse(chunks(), content_type=XLSX_CONTENT_TYPE), filename)
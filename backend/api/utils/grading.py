@@ -0,0 +1,167 @@
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from api.models.auth import ApplicantProfile
+from api.models.exam import ApplicantExam, ApplicantAnswer
+from api.utils.course_index import get_course_index
+from api.utils import statistics
+
+GRADE_FIELDS = ['attempted_questions', 'correct_answers', 'recommendation_score', 'accuracy', 'recommended_course']
+
+
+def tally(applicant_exam_ids):
+    """
+    Counts attempted and correct answers per attempt in one aggregate query,
+    judging correctness from the live Choice.is_correct rather than the counters.
+    Returns {applicant_exam_id: (attempted, correct)}.
+    """
+    rows = ApplicantAnswer.objects.filter(
+        applicant_exam_id__in=applicant_exam_ids
+    ).values('applicant_exam_id').annotate(
+        attempted=Count('id'),
+        correct=Count('id', filter=Q(selected_choice__is_correct=True)),
+    ).order_by()
+    return {row['applicant_exam_id']: (row['attempted'], row['correct']) for row in rows}
+
+
+def percentage(correct, total):
+    """correct/total as a 2-place Decimal percentage, comparable with stored scores"""
+    if not total:
+        return Decimal('0.00')
+    return (Decimal(correct * 100) / Decimal(total)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def apply_grade(applicant_exam, attempted, correct, course_index):
+    """Sets counters, recommendation_score, accuracy and recommended_course in memory"""
+    applicant_exam.attempted_questions = attempted
+    applicant_exam.correct_answers = correct
+    applicant_exam.recommendation_score = percentage(correct, applicant_exam.total_questions)
+    applicant_exam.accuracy = applicant_exam.recommendation_score
+    applicant_exam.recommended_course = course_index.recommend(applicant_exam.recommendation_score)
+
+
+def grade_attempt(applicant_exam):
+    """Completes and grades one attempt: one aggregate read, one write per table"""
+    attempted, correct = tally([applicant_exam.pk]).get(applicant_exam.pk, (0, 0))
+    apply_grade(applicant_exam, attempted, correct, get_course_index())
+    applicant_exam.status = 'completed'
+    applicant_exam.completed_at = timezone.now()
+
+    with transaction.atomic():
+        applicant_exam.save(update_fields=GRADE_FIELDS + ['status', 'completed_at'])
+        ApplicantProfile.objects.filter(pk=applicant_exam.applicant_id).update(
+            exam_status='completed',
+            exam_score=applicant_exam.recommendation_score,
+            updated_at=timezone.now(),
+        )
+    return applicant_exam
+
+
+def grade_exam(exam, batch_size=500):
+    """Batch mode: completes and grades every in-progress attempt of an exam in one pass"""
+    attempts = list(ApplicantExam.objects.filter(exam=exam, status='in_progress'))
+    if not attempts:
+        return 0
+
+    now = timezone.now()
+    course_index = get_course_index()
+    tallies = tally([attempt.pk for attempt in attempts])
+    before = statistics.snapshot(attempts)
+    profiles = []
+    for attempt in attempts:
+        attempted, correct = tallies.get(attempt.pk, (0, 0))
+        apply_grade(attempt, attempted, correct, course_index)
+        attempt.status = 'completed'
+        attempt.completed_at = now
+        profiles.append(ApplicantProfile(
+            pk=attempt.applicant_id,
+            exam_status='completed',
+            exam_score=attempt.recommendation_score,
+            updated_at=now,
+        ))
+
+    with transaction.atomic():
+        ApplicantExam.objects.bulk_update(attempts, GRADE_FIELDS + ['status', 'completed_at'], batch_size=batch_size)
+        ApplicantProfile.objects.bulk_update(profiles, ['exam_status', 'exam_score', 'updated_at'], batch_size=batch_size)
+        statistics.track(attempts, before)
+    return len(attempts)
+
+
+def regrade_exam(exam, chunk_size=2000):
+    """
+    Re-derives every stored result of an exam from the current answer key
+    and question count: ApplicantAnswer.is_correct with two set-based
+    UPDATEs, then counters, total_questions and scores per chunk of attempts
+    (one aggregate + one bulk_update of the rows that actually changed).
+    Returns a report of how much changed.
+    """
+    answers = ApplicantAnswer.objects.filter(applicant_exam__exam=exam)
+    with transaction.atomic():
+        became_correct = answers.filter(
+            is_correct=False, selected_choice__is_correct=True
+        ).update(is_correct=True)
+        became_wrong = answers.filter(is_correct=True).exclude(
+            selected_choice__is_correct=True
+        ).update(is_correct=False)
+
+    course_index = get_course_index()
+    # a deleted question must leave the denominator too
+    total_questions = exam.questions.count()
+    attempt_ids = list(ApplicantExam.objects.filter(exam=exam).order_by('pk').values_list('pk', flat=True))
+    changed_attempts = 0
+    rescored = {}
+
+    for start in range(0, len(attempt_ids), chunk_size):
+        chunk = attempt_ids[start:start + chunk_size]
+        tallies = tally(chunk)
+        changed = []
+        attempts = list(ApplicantExam.objects.filter(pk__in=chunk))
+        contributions = statistics.snapshot(attempts)
+        for attempt in attempts:
+            before = (attempt.total_questions, attempt.attempted_questions, attempt.correct_answers,
+                      attempt.recommendation_score, attempt.recommended_course_id)
+            attempted, correct = tallies.get(attempt.pk, (0, 0))
+            attempt.total_questions = total_questions
+            if attempt.status == 'completed':
+                apply_grade(attempt, attempted, correct, course_index)
+            else:
+                attempt.attempted_questions, attempt.correct_answers = attempted, correct
+            after = (attempt.total_questions, attempt.attempted_questions, attempt.correct_answers,
+                     attempt.recommendation_score, attempt.recommended_course_id)
+            if before != after:
+                changed.append(attempt)
+                if attempt.status == 'completed':
+                    rescored[attempt.pk] = (attempt.applicant_id, attempt.recommendation_score)
+
+        if changed:
+            ApplicantExam.objects.bulk_update(changed, GRADE_FIELDS + ['total_questions'])
+            statistics.track(changed, contributions)
+            changed_attempts += len(changed)
+
+    _sync_profile_scores(rescored)
+    return {
+        'answers_changed': became_correct + became_wrong,
+        'attempts_changed': changed_attempts,
+        'attempts_checked': len(attempt_ids),
+    }
+
+
+def _sync_profile_scores(rescored):
+    """Copies new scores onto profiles whose latest completed attempt was rescored"""
+    if not rescored:
+        return
+    applicant_ids = {applicant_id for applicant_id, _ in rescored.values()}
+    latest = {}
+    for applicant_id, pk in ApplicantExam.objects.filter(
+        applicant_id__in=applicant_ids, status='completed'
+    ).order_by('applicant_id', '-completed_at').values_list('applicant_id', 'pk'):
+        latest.setdefault(applicant_id, pk)
+
+    now = timezone.now()
+    profiles = [
+        ApplicantProfile(pk=applicant_id, exam_score=score, updated_at=now)
+        for pk, (applicant_id, score) in rescored.items()
+        if latest.get(applicant_id) == pk
+    ]
+    ApplicantProfile.objects.bulk_update(profiles, ['exam_score', 'updated_at'], batch_size=500)
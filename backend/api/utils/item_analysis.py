@@ -0,0 +1,184 @@
+"""
+Psychometric item analysis of an exam's questions.
+
+All answers of the exam's completed attempts are read in one query into a
+dense attempt x question matrix (correct flags and selected choice), and
+every statistic is computed on the whole matrix at once:
+
+- difficulty: share of attempts answering the question correctly
+- discrimination: point-biserial correlation of the question with the rest
+  of the score (the total without the question itself)
+- choice_rates: how often each choice was selected, so dead distractors or
+  a distractor outdrawing the key stand out
+
+Results are stored per question version (ItemStatistic), so they are read
+back without recomputation until the question or its choices change. A
+question's figures only count the answers given to its current version
+(ApplicantAnswer.question_version); answers without one (journaled before
+versions were recorded) count for the current version. An unanswered
+question records no version, so omissions are counted against the current
+version.
+"""
+from decimal import Decimal
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Q
+from api.models.exam import Exam, Question, Choice, ApplicantExam, ApplicantAnswer, ItemStatistic
+
+TOO_EASY = Decimal('0.9')
+TOO_HARD = Decimal('0.2')
+WEAK_DISCRIMINATION = Decimal('0.2')
+DEAD_DISTRACTOR = 0.05
+
+
+def _decimal(value):
+    return None if np.isnan(value) else Decimal(str(round(float(value), 4)))
+
+
+def answer_matrix(exam):
+    """
+    (question rows, choice rows, correct, selected, counted): `correct` is a
+    boolean attempt x question matrix, `selected` holds the index of the
+    chosen choice in choice rows (-1 when the question was left unanswered)
+    and `counted` is False where the answer was given to an earlier version
+    of the question.
+    """
+    questions = list(Question.objects.filter(exam=exam).order_by('id').values_list('id', 'version'))
+    choices = list(Choice.objects.filter(question__exam=exam).order_by('id').values_list(
+        'id', 'question_id', 'uuid', 'label', 'is_correct'
+    ))
+    attempt_ids = np.fromiter(
+        ApplicantExam.objects.filter(exam=exam, status='completed').order_by('id').values_list('id', flat=True), dtype=np.int64
+    )
+    rows = list(ApplicantAnswer.objects.filter(
+        applicant_exam__exam=exam, applicant_exam__status='completed'
+    ).values_list('applicant_exam_id', 'question_id', 'selected_choice_id', 'is_correct', 'question_version'))
+
+    question_ids = np.array([pk for pk, _ in questions], dtype=np.int64)
+    versions = np.array([version for _, version in questions], dtype=np.int64)
+    choice_ids = np.array([row[0] for row in choices], dtype=np.int64)
+    correct = np.zeros((attempt_ids.size, question_ids.size), dtype=bool)
+    selected = np.full((attempt_ids.size, question_ids.size), -1, dtype=np.int64)
+    counted = np.ones((attempt_ids.size, question_ids.size), dtype=bool)
+    if not rows or not attempt_ids.size:
+        return questions, choices, correct, selected, counted
+
+    def column(index, default=0):
+        return np.fromiter((default if row[index] is None else row[index] for row in rows), dtype=np.int64, count=len(rows))
+
+    row = np.searchsorted(attempt_ids, column(0))
+    question = np.searchsorted(question_ids, column(1))
+    correct[row, question] = column(3).astype(bool)
+    answered_versions = column(4, default=-1)
+    counted[row, question] = (answered_versions == -1) | (answered_versions == versions[question])
+
+    answer_choices = column(2)
+    choice = np.searchsorted(choice_ids, answer_choices)
+    known = (choice < choice_ids.size) & (choice_ids[np.minimum(choice, choice_ids.size - 1)] == answer_choices)
+    selected[row[known], question[known]] = choice[known]
+    return questions, choices, correct, selected, counted
+
+
+def item_statistics(correct, selected, counted, choice_questions):
+    """
+    Vectorized responses, difficulty, discrimination, omission and choice
+    selection rates, each question over its `counted` attempts only;
+    choice_questions maps every choice to its question's column.
+    """
+    weight = counted.astype(float)
+    responses = weight.sum(axis=0)
+
+    def mean(values):
+        return np.divide((values * weight).sum(axis=0), responses, out=np.full(responses.shape, np.nan), where=responses > 0)
+
+    scored = correct.astype(float)
+    rest = scored.sum(axis=1, keepdims=True) - scored
+    covariance = mean(scored * rest) - mean(scored) * mean(rest)
+    spread = np.sqrt(np.maximum(mean(scored ** 2) - mean(scored) ** 2, 0) * np.maximum(mean(rest ** 2) - mean(rest) ** 2, 0))
+    discrimination = np.divide(covariance, spread, out=np.full(spread.shape, np.nan), where=spread > 1e-12)
+    picks = np.bincount(selected[counted & (selected >= 0)], minlength=choice_questions.size)
+    choice_responses = responses[choice_questions]
+    return {
+        'responses': responses.astype(np.int64),
+        'difficulty': mean(scored),
+        'discrimination': discrimination,
+        'omitted_rate': mean((selected < 0).astype(float)),
+        'choice_rates': np.divide(picks, choice_responses, out=np.zeros(picks.shape), where=choice_responses > 0),
+    }
+
+
+def analyze_exam(exam):
+    """Recomputes and stores the item analysis of every question of `exam`; returns the rows"""
+    questions, choices, correct, selected, counted = answer_matrix(exam)
+    if not correct.shape[0] or not questions:
+        return []
+
+    columns = np.array([question_id for question_id, _ in questions], dtype=np.int64)
+    choice_questions = np.searchsorted(columns, np.array([row[1] for row in choices], dtype=np.int64))
+    stats = item_statistics(correct, selected, counted, choice_questions)
+    rates = {}
+    for index, (_, question_id, uuid, label, is_correct) in enumerate(choices):
+        rates.setdefault(question_id, []).append({
+            'choice': str(uuid),
+            'label': label,
+            'is_correct': is_correct,
+            'selection_rate': round(float(stats['choice_rates'][index]), 4),
+        })
+
+    items = [
+        ItemStatistic(
+            question_id=question_id,
+            question_version=version,
+            responses=int(stats['responses'][column]),
+            difficulty=_decimal(stats['difficulty'][column]),
+            discrimination=_decimal(stats['discrimination'][column]),
+            omitted_rate=_decimal(stats['omitted_rate'][column]),
+            choice_rates=sorted(rates.get(question_id, []), key=lambda rate: rate['label']),
+        )
+        for column, (question_id, version) in enumerate(questions)
+    ]
+    # replaced rather than upserted: MySQL has no ON CONFLICT target
+    stored = Q()
+    for question_id, version in questions:
+        stored |= Q(question_id=question_id, question_version=version)
+    with transaction.atomic():
+        # concurrent analyses of the exam take turns on its row
+        Exam.objects.select_for_update().filter(pk=exam.pk).exists()
+        ItemStatistic.objects.filter(stored).delete()
+        ItemStatistic.objects.bulk_create(items)
+    return current_statistics(exam)
+
+
+def current_statistics(exam):
+    """Stored analysis of the current version of each question of `exam`"""
+    return list(ItemStatistic.objects.filter(
+        question__exam=exam, question_version=F('question__version')
+    ).select_related('question').order_by('question_id'))
+
+
+def flags(item):
+    """Reasons an item needs a look, from its stored statistics"""
+    found = []
+    if item.difficulty is not None and item.difficulty > TOO_EASY:
+        found.append('too_easy')
+    if item.difficulty is not None and item.difficulty < TOO_HARD:
+        found.append('too_hard')
+    if item.discrimination is not None and item.discrimination < 0:
+        found.append('negative_discrimination')
+    elif item.discrimination is not None and item.discrimination < WEAK_DISCRIMINATION:
+        found.append('weak_discrimination')
+    key_rate = max((rate['selection_rate'] for rate in item.choice_rates if rate['is_correct']), default=None)
+    for rate in item.choice_rates:
+        if rate['is_correct']:
+            continue
+        if rate['selection_rate'] < DEAD_DISTRACTOR:
+            found.append(f"dead_distractor_{rate['label']}")
+        elif key_rate is not None and rate['selection_rate'] > key_rate:
+            found.append(f"distractor_outdraws_key_{rate['label']}")
+    return found
+
+
+def analyze_all():
+    """Batch job: analyzes every exam with completed attempts; returns the number of items stored"""
+    exams = Exam.objects.filter(applicantexam__status='completed').distinct()
+    return sum(len(analyze_exam(exam)) for exam in exams)
@@ -0,0 +1,155 @@
+"""
+Password verification for token/ under a login storm (a cohort logging in
+at exam start). PBKDF2 is CPU bound and holds the GIL, so with
+settings.LOGIN_PROCESS_POOL it runs in a bounded process pool instead of
+the request threads. Either way:
+
+- verifications of one username run one at a time in a process, later
+  attempts wait for their turn (up to TIMEOUT_SECONDS, then 429) rather
+  than being refused, so flooding a username cannot lock its owner out
+- at most LOGIN_POOL_QUEUE_LIMIT verifications wait or run in a process,
+  beyond that logins get 429 instead of piling up; a slot is held until
+  its verification has really finished
+- a verification taking longer than TIMEOUT_SECONDS answers 429
+- stats() reports the queue depth, its peak and the rejections
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework.exceptions import Throttled
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, 'LOGIN_PROCESS_POOL', False)
+WORKERS = getattr(settings, 'LOGIN_POOL_WORKERS', None) or os.cpu_count() or 1
+QUEUE_LIMIT = getattr(settings, 'LOGIN_POOL_QUEUE_LIMIT', None) or WORKERS * 8
+TIMEOUT_SECONDS = 30
+
+_lock = threading.Lock()
+_pool = None
+# username -> [lock, number of logins holding or waiting for it]
+_user_locks = {}
+_stats = {'queue_depth': 0, 'peak_queue_depth': 0, 'verified': 0, 'rejected': 0}
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def make_pool(workers):
+    # spawn, forking a threaded server process is unsafe
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker
+    )
+
+
+def verify(password, encoded):
+    """
+    check_password() as ModelBackend runs it: (is_correct, new encoded
+    password or None). The new hash is set when the stored one is outdated.
+    """
+    upgraded = []
+    correct = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return correct, (upgraded[0] if upgraded else None)
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = make_pool(WORKERS)
+        return _pool
+
+
+def _reject(detail):
+    with _lock:
+        _stats['rejected'] += 1
+    logger.warning('Login rejected: %s', detail)
+    raise Throttled(wait=1, detail=detail)
+
+
+def _enter(username):
+    """Waits for the user's earlier logins in this process to finish"""
+    with _lock:
+        entry = _user_locks.setdefault(username, [threading.Lock(), 0])
+        entry[1] += 1
+    if not entry[0].acquire(timeout=TIMEOUT_SECONDS):
+        _leave(username, locked=False)
+        _reject("A login for this user is still in progress, please retry.")
+
+
+def _leave(username, locked=True):
+    with _lock:
+        entry = _user_locks[username]
+        if locked:
+            entry[0].release()
+        entry[1] -= 1
+        if not entry[1]:
+            del _user_locks[username]
+
+
+def _take_slot():
+    with _lock:
+        full = _stats['queue_depth'] >= QUEUE_LIMIT
+        if not full:
+            _stats['queue_depth'] += 1
+            _stats['peak_queue_depth'] = max(_stats['peak_queue_depth'], _stats['queue_depth'])
+    if full:
+        _reject("Too many logins in progress, please retry.")
+
+
+def _finished(username):
+    with _lock:
+        _stats['queue_depth'] -= 1
+        _stats['verified'] += 1
+    _leave(username)
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        _pool = None
+
+
+def check(username, password, encoded):
+    """verify() in the user's turn and under the queue limit"""
+    username = username.lower()
+    _enter(username)
+    try:
+        _take_slot()
+    except Throttled:
+        _leave(username)
+        raise
+
+    if not ENABLED:
+        try:
+            return verify(password, encoded)
+        finally:
+            _finished(username)
+
+    try:
+        future = _get_pool().submit(verify, password, encoded)
+    except BrokenProcessPool:
+        _reset_pool()
+        _finished(username)
+        raise
+    # the slot and the user's turn are given back when the process is done, not when we stop waiting
+    future.add_done_callback(lambda done: _finished(username))
+    try:
+        return future.result(timeout=TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        _reject("Login is taking too long, please retry.")
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+
+
+def stats():
+    with _lock:
+        return {**_stats, 'process_pool': ENABLED, 'workers': WORKERS, 'queue_limit': QUEUE_LIMIT}
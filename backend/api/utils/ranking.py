@@ -0,0 +1,92 @@
+"""
+Ranks of completed attempts: higher recommendation_score first, then the
+earlier completed_at. An exam's order is read once with an indexed ORDER BY
+into a RankIndex, which is cached under the exam's results_version (bumped
+by api/utils/statistics.py whenever a result changes). Rank lookups and
+leaderboards then only index into it, nothing is sorted per request.
+"""
+import numpy as np
+from api.models.exam import Exam, ApplicantExam
+from api.utils.cache import LocalLRU, get_or_build
+from api.utils.distribution import results_version
+
+RANK_ORDER = ['-recommendation_score', 'completed_at', 'id']
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+_indexes = LocalLRU(maxsize=64)
+
+
+class RankIndex:
+    """Attempt ids in rank order, with their recommended course and rank within it"""
+
+    def __init__(self, rows):
+        self.attempt_ids = np.fromiter((pk for pk, _ in rows), dtype=np.int64, count=len(rows))
+        # 0 stands for no recommended course
+        self.course_ids = np.fromiter((course_id or 0 for _, course_id in rows), dtype=np.int64, count=len(rows))
+        self.positions = {int(pk): position for position, pk in enumerate(self.attempt_ids)}
+
+        courses, inverse, self.course_totals = np.unique(self.course_ids, return_inverse=True, return_counts=True)
+        self.course_ranks = np.empty(len(rows), dtype=np.int64)
+        for index in range(courses.size):
+            members = inverse == index
+            self.course_ranks[members] = np.arange(1, self.course_totals[index] + 1)
+        self.course_totals = dict(zip(courses.tolist(), self.course_totals.tolist()))
+
+    def __len__(self):
+        return int(self.attempt_ids.size)
+
+    def rank(self, attempt_id):
+        """
+        Rank of an attempt (None if it is not ranked). percentile is the
+        share of ranked attempts placed below it.
+        """
+        position = self.positions.get(attempt_id)
+        if position is None:
+            return None
+        total = len(self)
+        course_id = int(self.course_ids[position])
+        return {
+            'rank': position + 1,
+            'total': total,
+            'percentile': round((total - position - 1) / total * 100, 2),
+            'course_rank': int(self.course_ranks[position]) if course_id else None,
+            'course_total': self.course_totals[course_id] if course_id else None,
+        }
+
+    def top(self, limit=DEFAULT_LIMIT, course_id=None):
+        """Ids of the first `limit` attempts, optionally only those recommended `course_id`"""
+        attempt_ids = self.attempt_ids
+        if course_id is not None:
+            attempt_ids = attempt_ids[self.course_ids == course_id]
+        return attempt_ids[:limit].tolist()
+
+
+def get_rank_index(exam_id=None):
+    """RankIndex of one exam, or of every exam when exam_id is None"""
+    if exam_id is None:
+        version = results_version()
+    else:
+        version = Exam.objects.filter(pk=exam_id).values_list('results_version', flat=True).first()
+
+    def build():
+        attempts = ApplicantExam.objects.filter(status='completed', recommendation_score__isnull=False)
+        if exam_id is not None:
+            attempts = attempts.filter(exam_id=exam_id)
+        return RankIndex(list(attempts.order_by(*RANK_ORDER).values_list('id', 'recommended_course_id')))
+
+    return get_or_build(_indexes, f"rank_index:{exam_id or 'all'}:{version}", build)
+
+
+def attempt_rank(attempt):
+    return get_rank_index(attempt.exam_id).rank(attempt.pk)
+
+
+def leaderboard(exam_id=None, course_id=None, limit=DEFAULT_LIMIT):
+    """The top `limit` attempts in rank order, with their rank"""
+    index = get_rank_index(exam_id)
+    attempt_ids = index.top(limit, course_id)
+    attempts = ApplicantExam.objects.filter(pk__in=attempt_ids).select_related(
+        'applicant__user', 'exam', 'recommended_course'
+    ).in_bulk()
+    return [(index.rank(pk), attempts[pk]) for pk in attempt_ids if pk in attempts]
@@ -0,0 +1,99 @@
+import logging
+import threading
+from django.db import connection, transaction
+from django.db.models import Max, Min, OuterRef, Subquery, F
+from django.db.models.functions import Coalesce
+from api.models.admission import Course
+from api.models.auth import ApplicantProfile
+from api.models.exam import ApplicantExam
+from api.utils.statistics import rebuild_statistics
+
+logger = logging.getLogger(__name__)
+
+_state_lock = threading.Lock()
+_state = {'running': False, 'pending': False}
+
+
+def _threshold_course(score):
+    """Subquery for the course a score qualifies for, same order as CourseIndex"""
+    return Subquery(
+        Course.objects.filter(min_score__lte=score).order_by('-min_score', 'id').values('id')[:1]
+    )
+
+
+def _pk_ranges(queryset, chunk_size):
+    bounds = queryset.aggregate(lo=Min('pk'), hi=Max('pk'))
+    if bounds['lo'] is None:
+        return
+    for start in range(bounds['lo'], bounds['hi'] + 1, chunk_size):
+        yield start, start + chunk_size
+
+
+def rerecommend_courses(chunk_size=5000):
+    """
+    Recomputes recommended_course of every completed attempt against the
+    current Course thresholds, plus ApplicantProfile.course_applied where it
+    still equals the course recommended by the applicant's latest attempt.
+    Runs as chunked UPDATE ... SET = (subquery) statements over pk ranges,
+    never loading model instances.
+    """
+    completed = ApplicantExam.objects.filter(status='completed')
+    latest = completed.filter(applicant=OuterRef('pk')).order_by('-completed_at', '-pk')
+    latest_score = completed.filter(applicant=OuterRef(OuterRef('pk'))).order_by(
+        '-completed_at', '-pk'
+    ).values('recommendation_score')[:1]
+
+    # profiles first, so "derived" is judged against the old recommendations
+    profiles = ApplicantProfile.objects.filter(course_applied__isnull=False)
+    profiles_updated = 0
+    for start, end in _pk_ranges(profiles, chunk_size):
+        profiles_updated += profiles.filter(
+            pk__gte=start, pk__lt=end,
+            course_applied_id=Subquery(latest.values('recommended_course_id')[:1]),
+        ).update(
+            # like ApplicantExamSerializer.update, never clear a course_applied
+            course_applied=Coalesce(_threshold_course(Subquery(latest_score)), F('course_applied_id'))
+        )
+
+    attempts_updated = 0
+    for start, end in _pk_ranges(completed, chunk_size):
+        attempts_updated += completed.filter(pk__gte=start, pk__lt=end).update(
+            recommended_course=_threshold_course(OuterRef('recommendation_score'))
+        )
+
+    # both UPDATEs moved attempts and applicants between courses behind the signals' back
+    rebuild_statistics()
+    return {'attempts_updated': attempts_updated, 'profiles_updated': profiles_updated}
+
+
+def _run():
+    try:
+        while True:
+            with _state_lock:
+                if not _state['pending']:
+                    _state['running'] = False
+                    return
+                _state['pending'] = False
+            try:
+                rerecommend_courses()
+            except Exception:
+                logger.exception('Course re-recommendation failed')
+    finally:
+        connection.close()
+
+
+def schedule_rerecommendation():
+    """
+    Runs rerecommend_courses() in a background thread once the current
+    transaction commits; changes made while a run is in progress are
+    folded into one follow-up run.
+    """
+    def start():
+        with _state_lock:
+            _state['pending'] = True
+            if _state['running']:
+                return
+            _state['running'] = True
+        threading.Thread(target=_run, name='course-rerecommendation', daemon=True).start()
+
+    transaction.on_commit(start)
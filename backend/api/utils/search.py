@@ -0,0 +1,110 @@
+"""
+Applicant search over ApplicantSearchToken, a word index of every profile
+kept in sync by signals. A query matches profiles that have, for every
+query word, a token starting with it; the first word is an index range
+scan on (token, profile) and the others are index probes per candidate.
+Results rank by how many query words are whole tokens.
+"""
+import re
+import unicodedata
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery, Value, Case, When, IntegerField
+from api.models.auth import ApplicantProfile, ApplicantSearchToken
+
+MAX_QUERY_WORDS = 5
+TOKEN_LENGTH = 64
+
+
+def normalize(text):
+    """Lowercase and strip accents, so 'Peña' is found by 'pena'"""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def tokenize(*values):
+    tokens = set()
+    for value in values:
+        text = normalize(value)
+        words = re.findall(r'[a-z0-9]+', text)
+        tokens.update(word[:TOKEN_LENGTH] for word in words)
+        digits = ''.join(re.findall(r'\d+', text))
+        if len(digits) > 1:
+            # "0917-123 4567" is also found as "09171234567"
+            tokens.add(digits[:TOKEN_LENGTH])
+    return tokens
+
+
+def profile_tokens(profile):
+    user = profile.user
+    return tokenize(user.first_name, user.last_name, user.email, profile.contact_number, profile.high_school)
+
+
+def index_profiles(profiles):
+    """(Re)writes the tokens of the given profiles (user preloaded) in one delete and one insert"""
+    profiles = list(profiles)
+    with transaction.atomic():
+        ApplicantSearchToken.objects.filter(profile__in=profiles).delete()
+        ApplicantSearchToken.objects.bulk_create([
+            ApplicantSearchToken(profile=profile, token=token)
+            for profile in profiles
+            for token in profile_tokens(profile)
+        ], batch_size=1000)
+
+
+def rebuild_index(chunk_size=1000):
+    """Reindexes every profile, a chunk of pks at a time; returns the number indexed"""
+    total = 0
+    last_pk = 0
+    while True:
+        chunk = list(ApplicantProfile.objects.select_related('user').filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            return total
+        index_profiles(chunk)
+        total += len(chunk)
+        last_pk = chunk[-1].pk
+
+
+def search(queryset, query, profile_field='pk'):
+    """
+    Filters `queryset` (whose `profile_field` is an ApplicantProfile id) to the
+    rows matching `query` and annotates search_rank, the number of query words
+    that are whole tokens. Returns the queryset unchanged for an empty query.
+    """
+    words = sorted(tokenize(query), key=len, reverse=True)[:MAX_QUERY_WORDS]
+    if not words:
+        return queryset
+
+    tokens = ApplicantSearchToken.objects.filter(profile_id=OuterRef(profile_field))
+    # the longest word is the most selective, it drives the lookup
+    queryset = queryset.filter(**{
+        f'{profile_field}__in': Subquery(
+            ApplicantSearchToken.objects.filter(token__startswith=words[0]).values('profile_id')
+        )
+    })
+    for word in words[1:]:
+        queryset = queryset.filter(Exists(tokens.filter(token__startswith=word)))
+
+    rank = sum((
+        Case(When(Exists(tokens.filter(token=word)), then=1), default=0, output_field=IntegerField())
+        for word in words
+    ), Value(0))
+    return queryset.annotate(search_rank=rank)
+
+
+def apply_search(view, queryset, profile_field='pk'):
+    """
+    ?search= for list views: best ranked first, then the view's own order.
+    Also puts search_rank in front of the view's keyset_ordering so paginated
+    searches keep the same order.
+    """
+    query = view.request.query_params.get('search')
+    if not query:
+        return queryset
+    ordering = queryset.query.order_by
+    queryset = search(queryset, query, profile_field)
+    if 'search_rank' not in queryset.query.annotations:
+        return queryset
+    keyset_ordering = getattr(view, 'keyset_ordering', None)
+    if keyset_ordering and keyset_ordering[0] != '-search_rank':
+        view.keyset_ordering = ['-search_rank', *keyset_ordering]
+    return queryset.order_by('-search_rank', *ordering)
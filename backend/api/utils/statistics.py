@@ -0,0 +1,291 @@
+"""
+Materialized result statistics: ResultStatistic cells per (exam, recommended
+course) and CourseStatistic counters, so the admin statistics endpoints
+read O(courses) rows instead of aggregating every attempt.
+
+A completed attempt contributes (exam_id, course_id, score) to one cell.
+Creations, saves naming a statistics field in update_fields and deletes
+are tracked by signals (api/signals.py) against the stored row; bulk
+writers take a snapshot() before changing the instances they loaded and
+call track() after, and bulk UPDATEs end with rebuild_statistics().
+Adding to a cell is a single UPDATE; removing recomputes that one cell,
+since min/max cannot be decremented. A recompute runs after the caller
+commits, in a transaction of its own that locks the cell before reading
+anything (see _recompute).
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import partial
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Sum, Value, When
+from django.db.models.functions import Greatest, Least
+from api.models.admission import Course, CourseStatistic
+from api.models.auth import ApplicantProfile
+from api.models.exam import Exam, ApplicantExam, ResultStatistic
+
+UNKNOWN = object()
+
+
+def contribution(attempt):
+    """What an attempt adds to the statistics: (exam_id, course_id, score) or None"""
+    state = attempt.__dict__
+    if 'status' not in state or 'recommendation_score' not in state:
+        return UNKNOWN
+    if state['status'] != 'completed' or state['recommendation_score'] is None:
+        return None
+    score = Decimal(str(state['recommendation_score'])).quantize(Decimal('0.01'))
+    return (state['exam_id'], state.get('recommended_course_id'), score)
+
+
+def stored_contribution(attempt_id):
+    """contribution() of the row as currently stored, the instance may be stale"""
+    row = ApplicantExam.objects.filter(pk=attempt_id).values(
+        'status', 'recommendation_score', 'exam_id', 'recommended_course_id'
+    ).first()
+    return contribution(ApplicantExam(**row)) if row else None
+
+
+def applied_course(profile):
+    """The course an applicant profile counts towards, None if none (or not an applicant)"""
+    state = profile.__dict__
+    if 'user_type' not in state or 'course_applied_id' not in state:
+        return UNKNOWN
+    return state['course_applied_id'] if state['user_type'] == 'applicant' else None
+
+
+def stored_applied_course(profile_id):
+    row = ApplicantProfile.objects.filter(pk=profile_id).values('user_type', 'course_applied_id').first()
+    return applied_course(ApplicantProfile(**row)) if row else None
+
+
+def _decimal(value):
+    return Value(value, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _upsert_cell(exam_id, course_id, update, create):
+    """UPDATEs a cell, creating it under the Exam row lock if it does not exist yet"""
+    cells = ResultStatistic.objects.filter(exam_id=exam_id, course_id=course_id)
+    if cells.update(**update):
+        return
+    # unique_together does not cover course NULL, so creation is serialized per exam
+    if not list(Exam.objects.select_for_update().filter(pk=exam_id).values_list('pk', flat=True)):
+        return
+    if not cells.update(**update):
+        ResultStatistic.objects.create(exam_id=exam_id, course_id=course_id, **create)
+
+
+def _add(exam_id, course_id, scores):
+    count, total, low, high = len(scores), sum(scores), min(scores), max(scores)
+    # attempts goes last, MySQL evaluates SET clauses in order against the new values
+    _upsert_cell(exam_id, course_id, {
+        'min_score': Case(When(attempts=0, then=_decimal(low)), default=Least('min_score', _decimal(low))),
+        'max_score': Case(When(attempts=0, then=_decimal(high)), default=Greatest('max_score', _decimal(high))),
+        'score_sum': F('score_sum') + _decimal(total),
+        'attempts': F('attempts') + count,
+    }, {'attempts': count, 'score_sum': total, 'min_score': low, 'max_score': high})
+
+
+def _recompute(exam_id, course_id):
+    """
+    Rewrites a cell from its attempts. Its absolute values must not overwrite
+    an _add they do not include, so this runs in a fresh transaction and
+    locks the cell (or, if it does not exist yet, the Exam row cells are
+    created under) before the aggregate takes its snapshot. An _add that
+    already counted in the cell has committed by then and is in the
+    aggregate, one that has not will count on top of the new values.
+    """
+    cells = ResultStatistic.objects.filter(exam_id=exam_id, course_id=course_id)
+    with transaction.atomic():
+        exists = cells.select_for_update().exists()
+        if not exists:
+            if not Exam.objects.select_for_update().filter(pk=exam_id).exists():
+                return
+            exists = cells.select_for_update().exists()
+
+        values = ApplicantExam.objects.filter(
+            exam_id=exam_id, recommended_course_id=course_id,
+            status='completed', recommendation_score__isnull=False,
+        ).aggregate(
+            attempts=Count('id'),
+            score_sum=Sum('recommendation_score'),
+            min_score=Min('recommendation_score'),
+            max_score=Max('recommendation_score'),
+        )
+        values['score_sum'] = values['score_sum'] or 0
+        if exists:
+            cells.update(**values)
+        else:
+            ResultStatistic.objects.create(exam_id=exam_id, course_id=course_id, **values)
+
+
+def _bump_course(course_id, field, delta):
+    if not course_id or not delta:
+        return
+    stats = CourseStatistic.objects.filter(course_id=course_id)
+    if delta < 0:
+        # unsigned columns, never go below zero
+        stats.filter(**{f'{field}__gte': -delta}).update(**{field: F(field) + delta})
+        return
+    if stats.update(**{field: F(field) + delta}):
+        return
+    if Course.objects.filter(pk=course_id).exists():
+        CourseStatistic.objects.get_or_create(course_id=course_id)
+        stats.update(**{field: F(field) + delta})
+
+
+def record_many(changes):
+    """
+    Applies attempt contribution changes, an iterable of (old, new) pairs,
+    with one UPDATE per cell gaining attempts and one recompute per cell
+    losing any, once the transaction commits. Call after the attempts were
+    written. The exams' results_version is bumped after the commit too, so
+    the attempt transaction never holds the Exam row.
+    """
+    added = defaultdict(list)
+    removed = set()
+    recommended = Counter()
+    for old, new in changes:
+        if old is UNKNOWN or new is UNKNOWN:
+            raise ValueError('Attempts must be loaded with status and recommendation_score to track statistics')
+        if old == new:
+            continue
+        if old is not None:
+            removed.add(old[:2])
+            recommended[old[1]] -= 1
+        if new is not None:
+            added[new[:2]].append(new[2])
+            recommended[new[1]] += 1
+    if not added and not removed:
+        return
+
+    with transaction.atomic():
+        for (exam_id, course_id), scores in added.items():
+            if (exam_id, course_id) not in removed:
+                _add(exam_id, course_id, scores)
+        for course_id, delta in recommended.items():
+            _bump_course(course_id, 'recommended', delta)
+        transaction.on_commit(
+            partial(Exam.bump_results_version, {exam_id for exam_id, _ in added.keys() | removed}), robust=True
+        )
+        for exam_id, course_id in removed:
+            transaction.on_commit(partial(_recompute, exam_id, course_id), robust=True)
+
+
+def record(old, new):
+    record_many([(old, new)])
+
+
+def snapshot(attempts):
+    """For bulk_update callers: the attempts' contributions before they are changed"""
+    return {attempt.pk: contribution(attempt) for attempt in attempts}
+
+
+def track(attempts, before):
+    """For bulk_update callers: records each attempt's change since snapshot()"""
+    record_many((before[attempt.pk], contribution(attempt)) for attempt in attempts)
+
+
+def record_applicant(old_course_id, new_course_id):
+    if UNKNOWN in (old_course_id, new_course_id):
+        raise ValueError('Profiles must be loaded with user_type and course_applied to track statistics')
+    if old_course_id != new_course_id:
+        with transaction.atomic():
+            _bump_course(old_course_id, 'applicants', -1)
+            _bump_course(new_course_id, 'applicants', 1)
+
+
+def rebuild_statistics():
+    """Recomputes every cell and course counter from scratch with two GROUP BY queries"""
+    cells = ApplicantExam.objects.filter(
+        status='completed', recommendation_score__isnull=False
+    ).values('exam_id', 'recommended_course_id').annotate(
+        attempts=Count('id'),
+        score_sum=Sum('recommendation_score'),
+        min_score=Min('recommendation_score'),
+        max_score=Max('recommendation_score'),
+    ).order_by()
+    applicants = dict(ApplicantProfile.objects.filter(
+        user_type='applicant', course_applied__isnull=False
+    ).values('course_applied_id').annotate(n=Count('id')).order_by().values_list('course_applied_id', 'n'))
+
+    with transaction.atomic():
+        cells = list(cells)
+        recommended = Counter()
+        for cell in cells:
+            recommended[cell['recommended_course_id']] += cell['attempts']
+
+        ResultStatistic.objects.all().delete()
+        ResultStatistic.objects.bulk_create([
+            ResultStatistic(
+                exam_id=cell['exam_id'],
+                course_id=cell['recommended_course_id'],
+                attempts=cell['attempts'],
+                score_sum=cell['score_sum'],
+                min_score=cell['min_score'],
+                max_score=cell['max_score'],
+            )
+            for cell in cells
+        ], batch_size=1000)
+
+        Exam.objects.update(results_version=F('results_version') + 1)
+
+        CourseStatistic.objects.all().delete()
+        CourseStatistic.objects.bulk_create([
+            CourseStatistic(course_id=course_id, applicants=applicants.get(course_id, 0), recommended=recommended[course_id])
+            for course_id in Course.objects.values_list('pk', flat=True)
+        ], batch_size=1000)
+
+
+def result_statistics(exam_uuid=None, course_id=None, status=None):
+    """
+    The AdminViewResultsViewSet.statistics payload from the cells, grouped by
+    course (so O(courses) rows), for the filters the cells can answer.
+    """
+    cells = ResultStatistic.objects.filter(attempts__gt=0)
+    if exam_uuid:
+        cells = cells.filter(exam__uuid=exam_uuid)
+    if course_id:
+        cells = cells.filter(course_id=course_id)
+    if status == 'passed':
+        cells = cells.filter(course__isnull=False)
+    elif status == 'failed':
+        cells = cells.filter(course__isnull=True)
+
+    rows = list(cells.values('course_id', 'course__code', 'course__name').annotate(
+        count=Sum('attempts'),
+        score_sum=Sum('score_sum'),
+        min_score=Min('min_score'),
+        max_score=Max('max_score'),
+    ).order_by('-count'))
+
+    total = sum(row['count'] for row in rows)
+    score_sum = sum((row['score_sum'] for row in rows), Decimal(0))
+    passed = sum(row['count'] for row in rows if row['course_id'] is not None)
+    return {
+        'statistics': {
+            'total_exams': total,
+            'average_score': (score_sum / total).quantize(Decimal('0.01')) if total else None,
+            'highest_score': max((row['max_score'] for row in rows), default=None),
+            'lowest_score': min((row['min_score'] for row in rows), default=None),
+            'passed_count': passed,
+            'failed_count': total - passed,
+        },
+        'course_distribution': [
+            {
+                'recommended_course__code': row['course__code'],
+                'recommended_course__name': row['course__name'],
+                'count': row['count'],
+            }
+            for row in rows
+        ],
+    }
+
+
+def course_statistics():
+    """AdminCourseStatisticsView payload: one row per course"""
+    return [
+        {'name': name, 'total_applicants': applicants or 0, 'recommended_count': recommended or 0}
+        for name, applicants, recommended in Course.objects.values_list(
+            'name', 'statistic__applicants', 'statistic__recommended'
+        )
+    ]
@@ -0,0 +1,51 @@
+"""
+Revocation list for stateless JWTs. Requests authenticated from the token
+claims never read the User, so deactivating a user (or changing their role)
+records the time in TokenRevocation; tokens issued before it are refused.
+Rows are pruned once they outlive the longest token lifetime.
+
+Each process remembers a lookup for JWT_REVOCATION_CHECK_SECONDS, so a
+revocation takes at most that long to reach every worker, whatever cache
+the process has.
+"""
+import time
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from api.models.auth import TokenRevocation
+from api.utils.cache import LocalLRU
+
+CHECK_SECONDS = getattr(settings, 'JWT_REVOCATION_CHECK_SECONDS', 5)
+
+_checked = LocalLRU(maxsize=4096)
+
+
+def _lifetime():
+    return max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+
+
+def revoke_tokens(user_id):
+    """Refuses every token of the user issued up to now"""
+    now = timezone.now()
+    TokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': now})
+    TokenRevocation.objects.filter(revoked_at__lt=now - _lifetime()).delete()
+    _checked.set(str(user_id), (time.monotonic() + CHECK_SECONDS, now.timestamp()))
+
+
+def revoked_at(user_id):
+    # the user id claim is a string
+    user_id = str(user_id)
+    checked = _checked.get(user_id)
+    if checked is not None and checked[0] > time.monotonic():
+        return checked[1]
+    value = TokenRevocation.objects.filter(user_id=user_id).values_list('revoked_at', flat=True).first()
+    value = value.timestamp() if value else None
+    _checked.set(user_id, (time.monotonic() + CHECK_SECONDS, value))
+    return value
+
+
+def is_revoked(token):
+    # iat is in whole seconds: a token of the same second as the revocation
+    # may be a new login, so only earlier seconds are refused
+    revoked = revoked_at(token[api_settings.USER_ID_CLAIM])
+    return revoked is not None and token.get('iat', 0) < int(revoked)
@@ -10,6 +10,8 @@ from rest_framework.permissions import IsAuthenticated
 from api.serializers.AdmissionSerializer import UserSerializers
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
+from api.permissions import IsSuperAdmin
+from api.utils import login_pool
 
 User = get_user_model()
 
@@ -30,6 +32,14 @@ class CurrentUserView(APIView):
     })
 
 
+class LoginPoolStatusView(APIView):
+    """Queue depth and rejections of this process's login verifications"""
+    permission_classes = [IsAuthenticated, IsSuperAdmin]
+
+    def get(self, request):
+        return Response(login_pool.stats())
+
+
 class RegistrationView(mixins.CreateModelMixin, viewsets.GenericViewSet):
     serializer_class = RegisterSerializer
     queryset = ApplicantProfile.objects.all()
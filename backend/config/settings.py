@@ -47,7 +47,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES':(
         'rest_framework.permissions.IsAuthenticated',
@@ -93,14 +93,30 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "api.serializers.TokenSerializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "api.serializers.TokenSerializers.ClaimsTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Write-behind mode for TakeExamViewSet.submit_answer (see api/utils/answer_journal.py)
+ANSWER_WRITE_BEHIND = False
+ANSWER_JOURNAL_PATH = BASE_DIR / 'answer_journal.sqlite3'
+
+# Queued admission for UpcomingExamView.apply (see api/utils/admission.py)
+EXAM_ADMISSION_QUEUE = False
+
+# Password checks of token/ in a process pool (see api/utils/login_pool.py),
+# workers default to the CPU count and the queue limit to 8 per worker
+LOGIN_PROCESS_POOL = False
+LOGIN_POOL_WORKERS = None
+LOGIN_POOL_QUEUE_LIMIT = None
+
+# How long a worker trusts its last token revocation lookup (see api/utils/token_revocation.py)
+JWT_REVOCATION_CHECK_SECONDS = 5
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# server processes only (not manage.py commands): drain what a previous one left in the answer journal
+from api.utils import answer_journal  # noqa: E402
+
+if answer_journal.is_enabled():
+    answer_journal.start_flusher()